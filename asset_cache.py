@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+
+DEFAULT_CACHE_DIR = os.getenv("ASSET_CACHE_DIR", "cache")
+DEFAULT_MAX_BYTES = int(os.getenv("ASSET_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))  # 2 GB
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_by_use ON entries (last_used);
+"""
+
+
+def audio_cache_key(text: str, voice_id: str, model_id: str, output_format: str) -> str:
+    """Cache key for a synthesized voiceover."""
+    return _hash_key("audio", text, voice_id, model_id, output_format)
+
+
+def image_cache_key(prompt: str, seed: int, width: int, height: int, output_format: str) -> str:
+    """Cache key for a generated image."""
+    return _hash_key("image", prompt, seed, width, height, output_format)
+
+
+def segment_cache_key(*parts) -> str:
+    """Cache key for a rendered scene segment; ``parts`` describe all of its inputs."""
+    return _hash_key("segment", *parts)
+
+
+def pcm_cache_key(source_digest: str, sample_rate: int, channels: int) -> str:
+    """Cache key for an audio file decoded to raw samples."""
+    return _hash_key("pcm", source_digest, sample_rate, channels)
+
+
+def llm_cache_key(namespace: str, request: str) -> str:
+    """Cache key for a model response; ``request`` is the normalised request as JSON."""
+    return _hash_key("llm", namespace, request)
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _hash_key(*parts) -> str:
+    payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _link_or_copy(src: str, dest: str):
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    tmp_path = f"{dest}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dest)
+
+
+class AssetCache:
+    """
+    Content-addressed store for generated assets (voiceovers, images, ...).
+
+    Files live under ``root/objects/<key[:2]>/<key><ext>`` and a small
+    SQLite index (``index.db``) tracks their size and last use. When the
+    total size exceeds ``max_bytes`` the least recently used entries are
+    evicted. The index is shared safely by several processes, e.g. the
+    ``job_queue.py work`` workers.
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._index_path = os.path.join(root, "index.db")
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # Created on first use, so importing a module with a cache has no side effects
+        with self._lock:
+            if not self._ready:
+                os.makedirs(self.root, exist_ok=True)
+                with closing(sqlite3.connect(self._index_path, timeout=30, isolation_level=None)) as db:
+                    db.execute("PRAGMA journal_mode=WAL")
+                    db.executescript(INDEX_SCHEMA)
+                    self._import_json_index(db)
+                self._ready = True
+        return sqlite3.connect(self._index_path, timeout=30, isolation_level=None)
+
+    def _import_json_index(self, db: sqlite3.Connection):
+        """Carry entries over from the JSON index used by earlier versions."""
+        json_path = os.path.join(self.root, "index.json")
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        db.executemany(
+            "INSERT OR IGNORE INTO entries (key, file, size, last_used) VALUES (?, ?, ?, ?)",
+            [
+                (key, entry["file"], entry["size"], entry["last_used"]) for key, entry in index.items()
+                if os.path.exists(os.path.join(self.root, entry["file"]))
+            ],
+        )
+        try:
+            os.remove(json_path)
+        except OSError:
+            pass  # another process imported it first
+
+    def _object_path(self, key: str, ext: str) -> str:
+        return os.path.join("objects", key[:2], f"{key}{ext}")
+
+    def path_for(self, key: str) -> str | None:
+        """Return the cached file for ``key`` and mark it as recently used."""
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT file FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            path = os.path.join(self.root, row[0])
+            if not os.path.exists(path):
+                # Removed behind our back
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            return path
+
+    def fetch(self, key: str, dest: str) -> bool:
+        """
+        Place the cached asset for ``key`` at ``dest``.
+
+        Returns:
+            True on a cache hit, False if the key is not cached
+        """
+        path = self.path_for(key)
+        if path is None:
+            return False
+        _link_or_copy(path, dest)
+        return True
+
+    def store(self, key: str, src: str) -> str:
+        """
+        Add the file at ``src`` to the cache under ``key``.
+
+        Returns:
+            Path of the cached copy
+        """
+        ext = os.path.splitext(src)[1]
+        rel_path = self._object_path(key, ext)
+        path = os.path.join(self.root, rel_path)
+        _link_or_copy(src, path)
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "INSERT OR REPLACE INTO entries (key, file, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, rel_path, os.path.getsize(path), time.time()),
+            )
+            self._evict(db)
+            db.execute("COMMIT")
+        return path
+
+    def total_bytes(self) -> int:
+        with closing(self._connect()) as db:
+            return db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _evict(self, db: sqlite3.Connection):
+        # Caller holds a write transaction, so no other process evicts at the same time
+        (total,) = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if total <= self.max_bytes:
+            return
+        for key, rel_path, size in db.execute(
+            "SELECT key, file, size FROM entries ORDER BY last_used"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.root, rel_path))
+            except OSError:
+                pass
+            total -= size
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+
+asset_cache = AssetCache()
+segment_cache = AssetCache(
+    os.path.join(DEFAULT_CACHE_DIR, "segments"),
+    max_bytes=int(os.getenv("SEGMENT_CACHE_MAX_BYTES", str(4 * 1024 ** 3))),
+)
+llm_cache = AssetCache(
+    os.path.join(DEFAULT_CACHE_DIR, "llm"),
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 ** 2))),
+)
@@ -0,0 +1,230 @@
+import os
+import subprocess
+import tempfile
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+
+import numpy as np
+from moviepy.config import get_setting
+
+from asset_cache import asset_cache, file_digest, pcm_cache_key
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+MUSIC_DUCK_GAIN = float(os.getenv("MUSIC_DUCK_GAIN", "0.4"))  # extra music gain while someone speaks
+DUCK_THRESHOLD = 0.01  # RMS above which a block counts as speech
+DUCK_WINDOW = 0.05  # seconds per RMS block
+DUCK_SMOOTHING = 0.3  # seconds over which the ducking gain ramps
+MUSIC_FADE_IN = float(os.getenv("MUSIC_FADE_IN", "0.5"))  # seconds
+MUSIC_FADE_OUT = float(os.getenv("MUSIC_FADE_OUT", "1.5"))  # seconds
+MIX_BLOCK = SAMPLE_RATE  # samples decoded, mixed and muxed at a time
+
+
+def decode_audio(path: str, input_args: tuple[str, ...] = (),
+                 sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS) -> np.ndarray:
+    """
+    Decode any ffmpeg-readable audio into memory.
+
+    Args:
+        input_args: Extra ffmpeg options placed before ``-i``, e.g. ``("-f", "concat", "-safe", "0")``
+
+    Returns:
+        float32 array of shape (samples, channels) in [-1, 1]
+    """
+    cmd = [
+        get_setting("FFMPEG_BINARY"), "-loglevel", "error", *input_args, "-i", path,
+        "-vn", "-f", "f32le", "-acodec", "pcm_f32le", "-ar", str(sample_rate), "-ac", str(channels), "-",
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode {path}: {result.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, channels)
+
+
+@lru_cache(maxsize=4)
+def _load_music(path: str, mtime_ns: int, size: int, sample_rate: int, channels: int) -> np.ndarray:
+    key = pcm_cache_key(file_digest(path), sample_rate, channels)
+    cached = asset_cache.path_for(key)
+    if cached is not None:
+        samples = np.load(cached)
+    else:
+        samples = decode_audio(path, sample_rate=sample_rate, channels=channels)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            npy_path = os.path.join(tmp_dir, "music.npy")
+            np.save(npy_path, samples)
+            asset_cache.store(key, npy_path)
+    samples.flags.writeable = False
+    return samples
+
+
+def load_music(path: str, sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS) -> np.ndarray:
+    """
+    Decoded background music, shared by every job in the process and cached
+    on disk so other processes skip the decode too.
+    """
+    stat = os.stat(path)
+    return _load_music(os.path.abspath(path), stat.st_mtime_ns, stat.st_size, sample_rate, channels)
+
+
+def iter_audio(path: str, block: int, sample_rate: int = SAMPLE_RATE,
+               channels: int = CHANNELS) -> Iterator[np.ndarray]:
+    """Decode ``path`` with ffmpeg and yield it ``block`` samples at a time, never holding all of it."""
+    cmd = [
+        get_setting("FFMPEG_BINARY"), "-loglevel", "error", "-i", path,
+        "-vn", "-f", "f32le", "-acodec", "pcm_f32le", "-ar", str(sample_rate), "-ac", str(channels), "-",
+    ]
+    frame_bytes = 4 * channels
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+        try:
+            while data := proc.stdout.read(block * frame_bytes):
+                yield np.frombuffer(data[:len(data) - len(data) % frame_bytes], dtype=np.float32).reshape(-1, channels)
+            if proc.wait() != 0:
+                stderr.seek(0)
+                raise RuntimeError(f"ffmpeg could not decode {path}: {stderr.read().decode(errors='replace').strip()}")
+        finally:
+            proc.stdout.close()
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+
+def lay_out(clips: list[tuple[float, str]], duration: float, block: int,
+            sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS) -> Iterator[np.ndarray]:
+    """
+    Place audio files on a silent track and yield it ``block`` samples at a
+    time. Each file is decoded when the track reaches it and dropped once
+    it has been played, so only overlapping clips are held at once.
+
+    Args:
+        clips: ``(start_seconds, path)`` pairs
+        duration: Length of the track in seconds; clips past the end are cut
+    """
+    total = round(duration * sample_rate)
+    waiting = sorted((round(start * sample_rate), path) for start, path in clips)
+    playing = []
+    for block_start in range(0, total, block):
+        block_end = min(total, block_start + block)
+        while waiting and waiting[0][0] < block_end:
+            offset, path = waiting.pop(0)
+            playing.append((offset, decode_audio(path, sample_rate=sample_rate, channels=channels)))
+        out = np.zeros((block_end - block_start, channels), dtype=np.float32)
+        for offset, samples in playing:
+            lo, hi = max(block_start, offset), min(block_end, offset + len(samples))
+            if lo < hi:
+                out[lo - block_start:hi - block_start] += samples[lo - offset:hi - offset]
+        playing = [(offset, samples) for offset, samples in playing if offset + len(samples) > block_end]
+        yield out
+
+
+def _ramp(n: int, index: np.ndarray, rising: bool) -> np.ndarray:
+    """Gains of an ``n``-sample linear fade at ``index`` (0 to 1 when rising, 1 to 0 otherwise)."""
+    ramp = index / (n - 1) if n > 1 else np.zeros(len(index))
+    return (ramp if rising else 1.0 - ramp).astype(np.float32)[:, None]
+
+
+def mix_music(voice: Iterable[np.ndarray], music: np.ndarray, gain: float, duck: bool = True,
+              depth: float = MUSIC_DUCK_GAIN, sample_rate: int = SAMPLE_RATE) -> Iterator[np.ndarray]:
+    """
+    Loop ``music`` under a voice track at ``gain``, ducked while the voice
+    speaks and faded in and out, block by block.
+
+    The ducking gain of a moment depends on the voice slightly after it, and
+    the fade-out on where the track ends, so the last few seconds received
+    are held back; memory stays the same whatever the length of the track.
+
+    Args:
+        voice: Blocks of any size, float32 arrays of shape (samples, channels)
+        depth: Music gain while someone speaks, 1.0 in the gaps
+
+    Yields:
+        The mix, in blocks, sample for sample the length of ``voice``
+    """
+    window = max(1, int(sample_rate * DUCK_WINDOW))
+    taps = max(1, int(DUCK_SMOOTHING / DUCK_WINDOW))
+    behind, ahead = taps // 2, taps - 1 - taps // 2  # windows averaged on either side
+    fade_in, fade_out = int(MUSIC_FADE_IN * sample_rate), int(MUSIC_FADE_OUT * sample_rate)
+    hold = max(fade_in, fade_out, (ahead + 1) * window)
+
+    gains = []  # per window: depth while speaking, 1.0 otherwise
+    first_gain = 0  # window index of gains[0]; older windows are no longer needed
+    pending = None  # received samples not yet mixed
+    mixed = received = 0
+
+    def window_gain(samples):
+        rms = np.sqrt(np.square(samples, dtype=np.float32).sum() / (window * samples.shape[1]))
+        return depth if rms > DUCK_THRESHOLD else 1.0
+
+    def mix(samples, total=None):
+        index = np.arange(mixed, mixed + len(samples))
+        bed = music[index % len(music)] * np.float32(gain)
+        if duck:
+            windows = index // window
+            last = len(gains) + first_gain - 1
+            neighbours = np.clip(np.arange(windows[0], windows[-1] + 1)[:, None] + np.arange(-behind, ahead + 1),
+                                 0, last)
+            smoothed = np.asarray(gains)[neighbours - first_gain].mean(axis=1)
+            bed *= smoothed[windows - windows[0]].astype(np.float32)[:, None]
+        n_in = fade_in if total is None else min(total, fade_in)
+        if index[0] < n_in:
+            head = index < n_in
+            bed[head] *= _ramp(n_in, index[head], rising=True)
+        if total is not None:
+            n_out = min(total, fade_out)
+            tail = index >= total - n_out
+            if tail.any():
+                bed[tail] *= _ramp(n_out, index[tail] - (total - n_out), rising=False)
+        bed += samples
+        return np.clip(bed, -1.0, 1.0, out=bed)
+
+    for block in voice:
+        pending = block if pending is None else np.concatenate([pending, block])
+        received += len(block)
+        while (len(gains) + first_gain + 1) * window <= received:
+            start = (len(gains) + first_gain) * window - mixed
+            gains.append(window_gain(pending[start:start + window]))
+        ready = received - hold - mixed
+        if ready > 0:
+            yield mix(pending[:ready])
+            pending = pending[ready:]
+            mixed += ready
+            drop = max(0, mixed // window - behind - first_gain)
+            del gains[:drop]
+            first_gain += drop
+
+    if pending is not None and len(pending):
+        if (len(gains) + first_gain) * window < received:
+            start = (len(gains) + first_gain) * window - mixed
+            gains.append(window_gain(pending[start:]))
+        yield mix(pending, total=received)
+
+
+def mux_audio(video_path: str, blocks: Iterable[np.ndarray], output_path: str, audio_codec: str,
+              sample_rate: int = SAMPLE_RATE, channels: int = CHANNELS):
+    """Copy the video stream of ``video_path`` and encode ``blocks`` (piped as raw PCM) as its audio."""
+    cmd = [
+        get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+        "-i", video_path,
+        "-f", "f32le", "-ar", str(sample_rate), "-ac", str(channels), "-i", "-",
+        "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", audio_codec, "-shortest", output_path,
+    ]
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=stderr)
+        try:
+            for block in blocks:
+                proc.stdin.write(np.ascontiguousarray(block, dtype=np.float32).tobytes())
+        except BrokenPipeError:
+            pass  # ffmpeg stopped reading (the video ended); its exit code tells whether that was an error
+        except BaseException:
+            proc.kill()
+            raise
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+            proc.wait()
+        if proc.returncode != 0:
+            stderr.seek(0)
+            raise RuntimeError(f"ffmpeg failed ({proc.returncode}): {stderr.read().decode(errors='replace').strip()}")
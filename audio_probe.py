@@ -0,0 +1,139 @@
+import os
+import threading
+import wave
+
+from asset_cache import file_digest
+
+# Kbit/s by bitrate index, per (MPEG version, layer) family
+_BITRATES = {
+    ("1", 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    ("1", 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    ("1", 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    ("2", 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    ("2", 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    ("2", 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_SAMPLE_RATES = {"1": (44100, 48000, 32000), "2": (22050, 24000, 16000), "2.5": (11025, 12000, 8000)}
+_VERSIONS = {0: "2.5", 2: "2", 3: "1"}
+_LAYERS = {1: 3, 2: 2, 3: 1}
+
+_durations: dict[str, float] = {}
+_durations_lock = threading.Lock()
+
+
+def _parse_frame_header(header: bytes) -> tuple[int, int, int, str, int, int] | None:
+    """
+    Decode a 4-byte MPEG audio frame header.
+
+    Returns:
+        ``(frame_length, samples_per_frame, sample_rate, version, layer, channel_mode)``,
+        or None if ``header`` is not a valid frame header
+    """
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = _VERSIONS.get((header[1] >> 3) & 0x3)
+    layer = _LAYERS.get((header[1] >> 1) & 0x3)
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x3
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None  # reserved values, or free-format bitrate we can't size
+
+    bitrate = _BITRATES[("1" if version == "1" else "2", layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 0x1
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if layer == 2 or version == "1" else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+    return length, samples, sample_rate, version, layer, header[3] >> 6
+
+
+def _skip_id3v2(data: bytes) -> int:
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def mp3_duration(path: str) -> float:
+    """
+    Length of an MP3 in seconds, read from its frame headers without decoding.
+
+    Uses the frame count of a Xing/Info or VBRI header when present and
+    otherwise walks the frame headers, so both CBR and VBR files are exact.
+
+    Raises:
+        ValueError: if no MPEG audio frames are found
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    offset = _skip_id3v2(data)
+    # Find the first frame; require the next header to line up to avoid false syncs
+    while offset + 4 <= len(data):
+        first = _parse_frame_header(data[offset:offset + 4])
+        if first is not None:
+            following = offset + first[0]
+            if following + 4 > len(data) or _parse_frame_header(data[following:following + 4]) is not None:
+                break
+        offset += 1
+    else:
+        raise ValueError(f"No MPEG audio frames in {path}")
+
+    _, samples, sample_rate, version, layer, channel_mode = first
+    if layer == 3:
+        mono = channel_mode == 3
+        side_info = (17 if mono else 32) if version == "1" else (9 if mono else 17)
+        xing = offset + 4 + side_info
+        if (data[xing:xing + 4] in (b"Xing", b"Info") and len(data) >= xing + 12
+                and data[xing + 7] & 0x1):
+            frames = int.from_bytes(data[xing + 8:xing + 12], "big")
+            return frames * samples / sample_rate
+        vbri = offset + 36
+        if data[vbri:vbri + 4] == b"VBRI" and len(data) >= vbri + 18:
+            frames = int.from_bytes(data[vbri + 14:vbri + 18], "big")
+            return frames * samples / sample_rate
+
+    total_samples = 0
+    while offset + 4 <= len(data):
+        frame = _parse_frame_header(data[offset:offset + 4])
+        if frame is None or offset + frame[0] > len(data):
+            break  # trailing ID3v1/APE tag, garbage, or a frame cut off by truncation
+        total_samples += frame[1]
+        offset += frame[0]
+    return total_samples / sample_rate
+
+
+def _wav_duration(path: str) -> float:
+    with wave.open(path, "rb") as f:
+        return f.getnframes() / f.getframerate()
+
+
+def probe_duration(path: str, digest: str | None = None) -> float:
+    """
+    Audio length in seconds, cached per file content hash.
+
+    MP3 and WAV are measured from their headers; anything else falls back
+    to decoding the file once. Pass ``digest`` when the hash is already known.
+    """
+    digest = digest or file_digest(path)
+    with _durations_lock:
+        if digest in _durations:
+            return _durations[digest]
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".wav":
+        duration = _wav_duration(path)
+    else:
+        try:
+            duration = mp3_duration(path)
+        except ValueError:
+            from audio_mix import SAMPLE_RATE, decode_audio
+            duration = len(decode_audio(path)) / SAMPLE_RATE
+
+    with _durations_lock:
+        _durations[digest] = duration
+    return duration
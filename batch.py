@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+
+from elevenlab_test import create_script_writer, extract_captions
+from pipeline import RENDER_MAX_CONCURRENCY, ProviderLimits, produce_short
+from tools import IMAGE_MAX_CONCURRENCY, TTS_MAX_CONCURRENCY
+from providers import llm
+from tracing import Tracer, span, tracing
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+BATCH_MAX_JOBS = int(os.getenv("BATCH_MAX_JOBS", "4"))
+
+
+@dataclass
+class BatchJob:
+    job_id: str
+    topic: str
+
+
+def load_jobs(path: str) -> list[BatchJob]:
+    """
+    Read a JSONL file of topics. Each line is ``{"topic": "...", "id": "..."}``;
+    ``id`` is optional and defaults to the line number.
+
+    The id doubles as the job's directory name, so it is sanitized, and ids
+    that collide after sanitizing get a ``_2``, ``_3``, ... suffix.
+
+    Raises:
+        ValueError: if an id is made only of dots (it would name ``.`` or ``..``)
+    """
+    jobs, seen = [], set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            job_id = re.sub(r"[^A-Za-z0-9_.-]", "_", str(data.get("id") or f"job_{line_no:05d}"))
+            if not job_id.strip("."):
+                raise ValueError(f"Line {line_no}: invalid job id {data.get('id')!r}")
+            unique_id, n = job_id, 1
+            while unique_id in seen:
+                n += 1
+                unique_id = f"{job_id}_{n}"
+            seen.add(unique_id)
+            jobs.append(BatchJob(job_id=unique_id, topic=data["topic"]))
+    return jobs
+
+
+async def write_script(model_client, topic: str, llm_semaphore: asyncio.Semaphore) -> list[str]:
+    async with llm_semaphore:
+        with span("script", category="llm"):
+            result = await create_script_writer(model_client).run(task=topic)
+    return extract_captions(result.messages[-1].content)
+
+
+async def run_job(job: BatchJob, model_client, limits: ProviderLimits,
+                  llm_semaphore: asyncio.Semaphore, out_dir: str) -> dict:
+    """Run one topic end to end in its own working directory and describe the outcome."""
+    workdir = os.path.join(out_dir, job.job_id)
+    os.makedirs(workdir, exist_ok=True)
+    record = {"id": job.job_id, "topic": job.topic, "workdir": workdir}
+    started = time.monotonic()
+    tracer = Tracer(job.job_id)
+    with tracing(tracer):
+        try:
+            captions = await write_script(model_client, job.topic, llm_semaphore)
+            record["captions"] = captions
+            record["video_path"] = await produce_short(captions, workdir, limits)
+            record["status"] = "ok"
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = f"{type(e).__name__}: {e}"
+    record["duration_s"] = round(time.monotonic() - started, 2)
+    record["trace_path"] = tracer.export(os.path.join(workdir, "trace.json"))
+    return record
+
+
+async def run_batch(jobs: list[BatchJob], out_dir: str = "jobs", manifest_path: str | None = None,
+                    max_jobs: int = BATCH_MAX_JOBS, limits: ProviderLimits | None = None,
+                    llm_limit: int = LLM_MAX_CONCURRENCY, model_client=None) -> list[dict]:
+    """
+    Run many jobs concurrently and write a results manifest.
+
+    At most ``max_jobs`` jobs are in flight; the provider caps in ``limits``
+    and ``llm_limit`` are shared by all of them.
+
+    Returns:
+        One result record per job, in input order
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = manifest_path or os.path.join(out_dir, "results.jsonl")
+    limits = limits or ProviderLimits.create()
+    llm_semaphore = asyncio.Semaphore(llm_limit)
+    job_semaphore = asyncio.Semaphore(max_jobs)
+    owns_client = model_client is None
+    model_client = model_client or llm.get_model_client()
+
+    # Records are appended as jobs finish so a partial run still leaves a manifest
+    open(manifest_path, "w").close()
+
+    async def guarded(job: BatchJob) -> dict:
+        async with job_semaphore:
+            print(f"▶️ Starting job {job.job_id}: {job.topic}")
+            record = await run_job(job, model_client, limits, llm_semaphore, out_dir)
+        with open(manifest_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        icon = "✅" if record["status"] == "ok" else "❌"
+        print(f"{icon} Job {job.job_id} finished in {record['duration_s']}s ({record['status']})")
+        return record
+
+    try:
+        return await asyncio.gather(*[guarded(job) for job in jobs])
+    finally:
+        if owns_client:
+            await llm.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate many shorts from a JSONL file of topics.")
+    parser.add_argument("topics", help="JSONL file, one {\"topic\": ..., \"id\": ...} object per line")
+    parser.add_argument("--out-dir", default="jobs", help="Directory holding one working directory per job")
+    parser.add_argument("--manifest", default=None, help="Results manifest path (default: <out-dir>/results.jsonl)")
+    parser.add_argument("--jobs", type=int, default=BATCH_MAX_JOBS, help="Jobs to run concurrently")
+    parser.add_argument("--llm-limit", type=int, default=LLM_MAX_CONCURRENCY)
+    parser.add_argument("--tts-limit", type=int, default=TTS_MAX_CONCURRENCY)
+    parser.add_argument("--image-limit", type=int, default=IMAGE_MAX_CONCURRENCY)
+    parser.add_argument("--render-limit", type=int, default=RENDER_MAX_CONCURRENCY)
+    args = parser.parse_args()
+
+    async def run():
+        limits = ProviderLimits.create(tts=args.tts_limit, image=args.image_limit, render=args.render_limit)
+        return await run_batch(
+            load_jobs(args.topics), out_dir=args.out_dir, manifest_path=args.manifest,
+            max_jobs=args.jobs, limits=limits, llm_limit=args.llm_limit,
+        )
+
+    records = asyncio.run(run())
+    failed = sum(1 for record in records if record["status"] != "ok")
+    print(f"🏁 {len(records) - failed}/{len(records)} jobs succeeded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Offline benchmark for the video pipeline.
+
+ElevenLabs, Stability and the LLM are replaced by local stand-ins that
+return the fixture files in this repo after a configurable latency, so the
+hot paths can be measured without API keys or spend:
+
+    python benchmark.py --runs 5 --stages tts,images,video,graphflow
+    python benchmark.py --json bench.json                    # save results
+    python benchmark.py --baseline bench.json --threshold 20  # flag regressions
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+AUDIO_FIXTURE = os.path.join(REPO_DIR, "voiceovers", "voiceover_1.mp3")
+IMAGE_FIXTURE = os.path.join(REPO_DIR, "images", "image_1.webp")
+STAGES = ("tts", "images", "video", "graphflow")
+
+STUB_CAPTIONS = [
+    "Emerald shores, turquoise sea.",
+    "Sun-drenched days, endless views.",
+    "Tranquil sunsets, whispered secrets.",
+    "Adventure awaits, nature's embrace.",
+    "Island bliss. Your next escape."
+]
+
+
+def _sleep_latency(latency: float, jitter: float):
+    time.sleep(max(0.0, latency * (1 + random.uniform(-jitter, jitter))))
+
+
+# === FAKE PROVIDERS ===
+class FakeElevenLabs:
+    """Stands in for ``ElevenLabs``: ``text_to_speech.convert`` streams the fixture MP3."""
+
+    def __init__(self, latency: float, jitter: float, chunk_size: int = 4096):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_size = chunk_size
+        self.text_to_speech = self
+        with open(AUDIO_FIXTURE, "rb") as f:
+            self._audio = f.read()
+
+    def convert(self, text, voice_id, model_id, output_format):
+        _sleep_latency(self.latency, self.jitter)
+        for start in range(0, len(self._audio), self.chunk_size):
+            yield self._audio[start:start + self.chunk_size]
+
+
+def start_fake_stability(latency: float, jitter: float) -> ThreadingHTTPServer:
+    """Serve the fixture image for every POST on a local port."""
+    with open(IMAGE_FIXTURE, "rb") as f:
+        image = f.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            _sleep_latency(latency, jitter)
+            self.send_response(200)
+            self.send_header("Content-Type", "image/webp")
+            self.send_header("Content-Length", str(len(image)))
+            self.end_headers()
+            self.wfile.write(image)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_fake_model_client(captions: list[str], latency: float, jitter: float):
+    """
+    A model client that answers like the script writer would, with the
+    captions as JSON. The other agents of the graph run their tools
+    directly and never call the model.
+    """
+    from autogen_core.models import ChatCompletionClient, CreateResult, RequestUsage
+
+    class FakeChatCompletionClient(ChatCompletionClient):
+        def __init__(self):
+            self._calls = 0
+
+        async def create(self, messages, *, tools=(), **kwargs):
+            await asyncio.sleep(max(0.0, latency * (1 + random.uniform(-jitter, jitter))))
+            self._calls += 1
+            usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+            script = json.dumps({"topic": "benchmark", "takeaway": "benchmark", "captions": captions})
+            return CreateResult(finish_reason="stop", content=script, usage=usage, cached=False)
+
+        async def create_stream(self, messages, **kwargs):
+            yield await self.create(messages, **kwargs)
+
+        async def close(self):
+            pass
+
+        def actual_usage(self):
+            return RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+        def total_usage(self):
+            return RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+        def count_tokens(self, messages, **kwargs):
+            return 0
+
+        def remaining_tokens(self, messages, **kwargs):
+            return 1_000_000
+
+        @property
+        def capabilities(self):
+            return self.model_info
+
+        @property
+        def model_info(self):
+            return {
+                "vision": False,
+                "function_calling": True,
+                "json_output": True,
+                "structured_output": False,
+                "family": "unknown",
+            }
+
+    return FakeChatCompletionClient()
+
+
+def fixture_assets() -> tuple[list, list]:
+    """Voiceovers and images from the repo's fixtures, one per stub caption."""
+    from manifest import AudioAsset, ImageAsset
+
+    count = len(STUB_CAPTIONS)
+    voiceovers = [
+        AudioAsset.from_file(os.path.join(REPO_DIR, "voiceovers", f"voiceover_{i % 5 + 1}.mp3"), "fixture")
+        for i in range(count)
+    ]
+    images = [
+        ImageAsset.from_file(os.path.join(REPO_DIR, "images", f"image_{i % 5 + 1}.webp"), "fixture")
+        for i in range(count)
+    ]
+    return voiceovers, images
+
+
+# === REPORTING ===
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(durations: dict, scenes: int) -> dict:
+    summary = {}
+    for stage, values in durations.items():
+        mean = sum(values) / len(values)
+        summary[stage] = {
+            "runs": len(values),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "mean_ms": mean * 1000,
+            "scenes_per_s": scenes / mean if mean else 0.0,
+        }
+    return summary
+
+
+def print_report(summary: dict, baseline: dict | None = None):
+    print(f"\n{'stage':<10} {'runs':>5} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10} {'scenes/s':>9}  vs baseline")
+    for stage, row in summary.items():
+        delta = ""
+        if baseline and stage in baseline:
+            change = (row["p50_ms"] - baseline[stage]["p50_ms"]) / baseline[stage]["p50_ms"] * 100
+            delta = f"{change:+.1f}% p50"
+        print(f"{stage:<10} {row['runs']:>5} {row['p50_ms']:>10.1f} {row['p95_ms']:>10.1f} "
+              f"{row['mean_ms']:>10.1f} {row['scenes_per_s']:>9.2f}  {delta}")
+
+
+def regressions(summary: dict, baseline: dict, threshold_pct: float) -> list[str]:
+    return [
+        stage for stage, row in summary.items()
+        if stage in baseline and row["p50_ms"] > baseline[stage]["p50_ms"] * (1 + threshold_pct / 100)
+    ]
+
+
+# === MAIN ===
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline against local fake providers.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--stages", default="tts,images,video,graphflow",
+                        help=f"Comma-separated subset of {','.join(STAGES)}")
+    parser.add_argument("--tts-latency", type=float, default=0.8, help="Seconds per fake TTS request")
+    parser.add_argument("--image-latency", type=float, default=1.5, help="Seconds per fake image request")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per fake model call")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative latency jitter (0.2 = ±20%%)")
+    parser.add_argument("--warm", action="store_true", help="Reuse captions across runs to measure cache hits")
+    parser.add_argument("--json", dest="json_path", help="Write the summary to this file")
+    parser.add_argument("--baseline", help="Compare against a summary written by --json")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Allowed p50 slowdown in percent")
+    args = parser.parse_args()
+
+    requested = {stage.strip() for stage in args.stages.split(",") if stage.strip()}
+    unknown = requested - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+    # Always in pipeline order, so the video stage runs after the assets it renders
+    stages = [stage for stage in STAGES if stage in requested]
+
+    json_path = os.path.abspath(args.json_path) if args.json_path else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    # Work in a scratch directory with its own asset cache; provider
+    # settings are read when tools.py is imported, so set them first
+    workdir = tempfile.mkdtemp(prefix="shorts-bench-")
+    os.environ["ASSET_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ.setdefault("TTS_REQUESTS_PER_SECOND", "1000")
+    sys.path.insert(0, REPO_DIR)
+    os.chdir(workdir)
+    os.symlink(os.path.join(REPO_DIR, "music"), os.path.join(workdir, "music"))
+
+    server = start_fake_stability(args.image_latency, args.jitter)
+    os.environ["STABILITY_API_URL"] = f"http://127.0.0.1:{server.server_address[1]}/generate"
+
+    import tools
+    from elevenlab_test import create_team
+    from manifest import JobManifest, record_assets
+    from providers import elevenlabs_tts
+
+    elevenlabs_tts.set_client(FakeElevenLabs(args.tts_latency, args.jitter))
+
+    # Without the voice and image stages the video stage renders the
+    # fixtures; they are hashed and probed once, outside the timed runs
+    fixtures = None if {"tts", "images"} <= set(stages) else fixture_assets()
+
+    durations = {stage: [] for stage in stages}
+    for run in range(args.runs):
+        captions = STUB_CAPTIONS if args.warm else [f"{caption} #{run}" for caption in STUB_CAPTIONS]
+        stage_fns = {
+            "tts": lambda: record_assets(".", captions, voiceovers=asyncio.run(tools.generate_voiceovers(captions))),
+            "images": lambda: record_assets(
+                ".", captions, images=tools.generate_images([tools.caption_to_prompt(c) for c in captions])
+            ),
+            "video": lambda: tools.generate_video(
+                captions, manifest=JobManifest(captions, *fixtures) if fixtures else None
+            ),
+            "graphflow": lambda: asyncio.run(
+                create_team(make_fake_model_client(captions, args.llm_latency, args.jitter)).run(task="benchmark")
+            ),
+        }
+        for stage in stages:
+            started = time.perf_counter()
+            stage_fns[stage]()
+            durations[stage].append(time.perf_counter() - started)
+            print(f"run {run + 1}/{args.runs} {stage}: {durations[stage][-1] * 1000:.0f} ms")
+
+    server.shutdown()
+    summary = summarize(durations, len(STUB_CAPTIONS))
+    baseline = None
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(summary, baseline)
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    if baseline:
+        slow = regressions(summary, baseline, args.threshold)
+        if slow:
+            print(f"❌ p50 regressed by more than {args.threshold}% in: {', '.join(slow)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
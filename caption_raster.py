@@ -0,0 +1,73 @@
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+LINE_SPACING = 1.15  # multiple of the font's line height
+
+
+@lru_cache(maxsize=32)
+def load_font(font_path: str, fontsize: int) -> ImageFont.FreeTypeFont:
+    try:
+        return ImageFont.truetype(font_path, fontsize)
+    except OSError:
+        print(f"⚠️ Font {font_path} not found, falling back to Pillow's default font")
+        return ImageFont.load_default(size=fontsize)
+
+
+def _wrap_words(text: str, font, max_width: int) -> list[str]:
+    """Greedy word wrap; a single word wider than ``max_width`` gets its own line."""
+    lines = []
+    current = ""
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if current and font.getlength(candidate) > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines or [""]
+
+
+@lru_cache(maxsize=1024)
+def layout_caption(text: str, font_path: str, fontsize: int, width: int) -> tuple[tuple[str, int, int], ...]:
+    """
+    Wrap and position caption lines.
+
+    Returns:
+        ``(line, x, y)`` for every line, with each line centred in ``width``
+    """
+    font = load_font(font_path, fontsize)
+    ascent, descent = font.getmetrics()
+    line_height = round((ascent + descent) * LINE_SPACING)
+    return tuple(
+        (line, round((width - font.getlength(line)) / 2), row * line_height)
+        for row, line in enumerate(_wrap_words(text, font, width))
+    )
+
+
+@lru_cache(maxsize=256)
+def render_caption(text: str, font_path: str, fontsize: int, width: int,
+                   color: tuple[int, int, int] = (255, 255, 255)) -> np.ndarray:
+    """
+    Rasterize a caption with Pillow.
+
+    Returns:
+        Read-only RGBA array of shape (height, width, 4), ready for
+        ``ImageClip(array, transparent=True)``
+    """
+    font = load_font(font_path, fontsize)
+    lines = layout_caption(text, font_path, fontsize, width)
+    ascent, descent = font.getmetrics()
+    height = lines[-1][2] + ascent + descent
+
+    canvas = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(canvas)
+    for line, x, y in lines:
+        draw.text((x, y), line, font=font, fill=(*color, 255))
+
+    array = np.asarray(canvas)
+    array.flags.writeable = False
+    return array
@@ -0,0 +1,194 @@
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+HEDGE_POOL_SIZE = 32  # threads shared by all hedged attempts
+
+
+class NoCapacity(RuntimeError):
+    """A hedged duplicate was not sent: no request slot or rate-limit token was free."""
+
+
+class HedgeAttempt:
+    """
+    One attempt of a :func:`hedged_call`, visible to the code serving it
+    through ``current_attempt``.
+
+    Whatever holds the request slot marks the attempt ``sent`` once it is
+    in flight (the hedge deadline starts then, not while it queues). A
+    ``duplicate`` never waits for a slot or a token, and an ``abandoned``
+    attempt lost the race, so its outcome says nothing about the backend.
+    """
+
+    def __init__(self, duplicate: bool):
+        self.duplicate = duplicate
+        self.sent = False
+        self.abandoned = False
+        self._settled = threading.Event()  # sent, or finished without being sent
+
+    def mark_sent(self):
+        self.sent = True
+        self._settled.set()
+
+
+current_attempt: contextvars.ContextVar[HedgeAttempt | None] = contextvars.ContextVar(
+    "current_attempt", default=None
+)
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter usable from coroutines and worker threads.
+
+    ``rate`` tokens are added per second up to ``capacity``; each request
+    takes one token and waits when the bucket is empty.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        """Take ``tokens`` if available, otherwise return how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1.0):
+        while (wait := self._reserve(tokens)) > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, tokens: float = 1.0):
+        """Wait for ``tokens``; a hedged duplicate raises :class:`NoCapacity` instead of waiting."""
+        attempt = current_attempt.get()
+        while (wait := self._reserve(tokens)) > 0:
+            if attempt is not None and attempt.duplicate:
+                raise NoCapacity("rate limit reached")
+            time.sleep(wait)
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Exponential backoff with full jitter for the given (1-based) attempt."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+async def retry_async(fn, *args, attempts: int = 3, base_delay: float = 0.5,
+                      max_delay: float = 8.0, retry_on=(Exception,), **kwargs):
+    """Await ``fn(*args, **kwargs)``, retrying failures with exponential backoff."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return await fn(*args, **kwargs)
+        except retry_on as e:
+            if attempt == attempts:
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            print(f"⚠️ Attempt {attempt}/{attempts} failed ({e}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+def retry_call(fn, *args, attempts: int = 3, base_delay: float = 0.5,
+               max_delay: float = 8.0, retry_on=(Exception,), **kwargs):
+    """Blocking counterpart of :func:`retry_async` for worker threads."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn(*args, **kwargs)
+        except retry_on as e:
+            if attempt == attempts:
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            print(f"⚠️ Attempt {attempt}/{attempts} failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+_hedge_pool = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_POOL_SIZE, thread_name_prefix="hedge")
+        return _hedge_pool
+
+
+def _discard(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def hedged_call(fn, output_path: str, hedge_after: float | None, has_capacity=None):
+    """
+    Run ``fn(path)``, which writes its result to ``path``, and if it has not
+    finished ``hedge_after`` seconds after going in flight, start a second,
+    identical attempt. Each attempt writes to its own file; the first to
+    succeed is moved to ``output_path`` and the loser's file is removed once
+    it ends.
+
+    The deadline starts when the attempt marks itself sent (the provider
+    does when it hands out a request slot), so time spent queueing for a
+    slot or a rate-limit token does not count. No duplicate is sent while
+    ``has_capacity()`` is false or once it finds every slot taken, and the
+    loser is marked abandoned so it does not count towards the provider's
+    health.
+
+    Returns:
+        ``(result, attempts_sent)``; 2 when a duplicate went out
+    """
+    root, ext = os.path.splitext(output_path)
+    attempts = {}
+
+    def start(duplicate: bool) -> HedgeAttempt:
+        attempt = HedgeAttempt(duplicate)
+        path = f"{root}.attempt{len(attempts) + 1}{ext}"
+        context = contextvars.copy_context()  # keeps the caller's tracer visible in the pool thread
+        context.run(current_attempt.set, attempt)
+        future = _get_hedge_pool().submit(context.run, fn, path)
+        future.add_done_callback(lambda _: attempt._settled.set())
+        attempts[future] = (attempt, path)
+        return attempt
+
+    first = start(duplicate=False)
+    if hedge_after is not None:
+        first._settled.wait()
+        done, _ = wait(attempts, timeout=hedge_after)
+        if not done:
+            if has_capacity is not None and not has_capacity():
+                print(f"⏱️ No response after {hedge_after:.1f}s, but the provider is saturated; not hedging")
+            else:
+                print(f"⏱️ No response after {hedge_after:.1f}s; sending a hedged request")
+                start(duplicate=True)
+
+    pending = set(attempts)
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        winner = next((future for future in done if future.exception() is None), None)
+        if winner is None:
+            for future in done:
+                if not isinstance(future.exception(), NoCapacity):
+                    error = future.exception()
+                _discard(attempts[future][1])
+            continue
+        os.replace(attempts[winner][1], output_path)
+        for future in done - {winner}:
+            _discard(attempts[future][1])
+        for future in pending:
+            attempts[future][0].abandoned = True
+            future.add_done_callback(lambda _, path=attempts[future][1]: _discard(path))
+        return winner.result(), 1 + sum(attempt.sent for attempt, _ in attempts.values() if attempt.duplicate)
+    raise error
@@ -1,157 +1,290 @@
 import asyncio
-import os
+import inspect
 import json
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dotenv import load_dotenv
 from typing_extensions import Annotated
-from autogen_core.tools import FunctionTool
-from autogen_agentchat.agents import AssistantAgent
+from autogen_core import CancellationToken
+from autogen_agentchat.agents import AssistantAgent, BaseChatAgent
+from autogen_agentchat.base import Response
+from autogen_agentchat.messages import ModelClientStreamingChunkEvent, TextMessage
 from autogen_agentchat.teams import GraphFlow, DiGraphBuilder
-from autogen_agentchat.conditions import TextMentionTermination
+from autogen_agentchat.conditions import SourceMatchTermination
 from autogen_agentchat.ui import Console
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from tools import generate_voiceovers, generate_images, generate_video
+from providers.llm import get_model_client
+from script_schema import (
+    CAPTION_COUNT, CAPTION_MAX_WORDS, SCRIPT_MAX_REPAIRS, CaptionStreamParser, ScriptValidationError,
+    parse_script, repair_prompt
+)
+from manifest import record_assets
+from speculation import SPECULATIVE_ASSETS, Speculator
+from tracing import Tracer, span, tracing
+from tools import generate_voiceovers, generate_images, generate_video, caption_to_prompt
 
 # Load environment variables
 load_dotenv()
 
+# === JOB DIRECTORY ===
+# Where the tools of the current run write their assets; set per run so
+# concurrent runs in one process don't overwrite each other's files
+job_workdir: ContextVar[str] = ContextVar("job_workdir", default=".")
+
+@contextmanager
+def working_directory(path):
+    os.makedirs(path, exist_ok=True)
+    token = job_workdir.set(path)
+    try:
+        yield path
+    finally:
+        job_workdir.reset(token)
+
 # === TOOL WRAPPERS ===
 async def generate_voiceovers_tool(
     captions: Annotated[list[str], "List of captions to convert to voice"]
 ) -> dict:
-    audio_paths = await generate_voiceovers(captions)
-    return {"voiceover_paths": audio_paths}
-
-voiceover_tool = FunctionTool(
-    generate_voiceovers_tool,
-    name="generate_voiceovers_tool",
-    description="Generate voiceovers from captions using ElevenLabs and save them locally."
-)
+    workdir = job_workdir.get()
+    voiceovers = await generate_voiceovers(captions, output_dir=os.path.join(workdir, "voiceovers"))
+    # The director renders from the job manifest, not from directory listings
+    record_assets(workdir, captions, voiceovers=voiceovers)
+    return {"voiceover_paths": [voiceover.path for voiceover in voiceovers]}
 
 def generate_images_tool(
     captions: Annotated[list[str], "List of short captions to convert into images"]
 ) -> dict:
-    prompts = [f"{caption} in Abstract Art Style / Ultra High Quality." for caption in captions]
-    image_paths = generate_images(prompts)
+    workdir = job_workdir.get()
+    prompts = [caption_to_prompt(caption) for caption in captions]
+    images = generate_images(prompts, output_dir=os.path.join(workdir, "images"))
+    record_assets(workdir, captions, images=images)
+    image_paths = [image.path for image in images]
     print("[TOOL] generate_images_tool returned:", image_paths)
-    if image_paths is None:
-        image_paths = []
     # Pass captions along with image_paths for the director agent
     return {"image_paths": image_paths, "captions": captions}
 
-image_generation_tool = FunctionTool(
-    generate_images_tool,
-    name="generate_images_tool",
-    description="Generate images from a list of captions using Stability AI."
-)
-
 def generate_video_tool(
     captions: Annotated[list[str], "List of cleaned captions for video creation"]
 ) -> dict:
     print("[TOOL] generate_video_tool called with captions:", captions)
-    generate_video(captions)
-    return {"video_path": "final_output.mp4"}
+    video_path = generate_video(captions, workdir=job_workdir.get())
+    return {"video_path": video_path}
 
-video_generation_tool = FunctionTool(
-    generate_video_tool,
-    name="generate_video_tool",
-    description="Create a video using pre-generated voiceovers, images, and provided captions."
-)
+# === TOOL NODES ===
+class ToolNode(BaseChatAgent):
+    """
+    Graph node that calls one tool with the script's captions directly,
+    without a model round trip in between.
+
+    The captions come from the latest valid script among the messages of
+    the current run; sync tools run in a worker thread. With a speculator, the
+    node first waits for assets requested while the script was streaming.
+    """
 
-# === CAPTIONS GLOBAL VARIABLE ===
-captions_global = []
+    def __init__(self, name, tool, description, speculator=None):
+        super().__init__(name, description=description)
+        self._tool = tool
+        self._speculator = speculator
+
+    @property
+    def produced_message_types(self):
+        return (TextMessage,)
+
+    async def on_messages(self, messages, cancellation_token: CancellationToken) -> Response:
+        # Only this call's messages: captions kept from an earlier run would
+        # send the previous script to the tools
+        captions = None
+        for message in reversed(messages):
+            try:
+                captions = parse_script(getattr(message, "content", None)).captions
+                break
+            except ScriptValidationError:
+                continue
+        if captions is None:
+            raise ScriptValidationError([f"{self.name} received no script to work from"])
+
+        if self._speculator is not None:
+            await self._speculator.settle(captions)
+        with span(f"tool.{self.name}", category="tool", captions=len(captions)):
+            if inspect.iscoroutinefunction(self._tool):
+                result = await self._tool(captions)
+            else:
+                result = await asyncio.to_thread(self._tool, captions)
+        return Response(chat_message=TextMessage(content=json.dumps(result), source=self.name))
+
+    async def on_reset(self, cancellation_token: CancellationToken) -> None:
+        pass  # keeps no state between runs
+
+# === GRAPH ===
+# "parallel": voice_actor and graphic_designer both run after script_writer and
+# director joins on both. "sequential": the original linear chain.
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "parallel")
+
+def build_graph(script_writer, voice_actor, graphic_designer, director, mode=PIPELINE_MODE):
+    builder = DiGraphBuilder()
+    builder.add_node(script_writer)
+    builder.add_node(voice_actor)
+    builder.add_node(graphic_designer)
+    builder.add_node(director, activation="all")
+    if mode == "sequential":
+        builder.add_edge(script_writer, voice_actor)
+        builder.add_edge(voice_actor, graphic_designer)
+        builder.add_edge(graphic_designer, director)
+    elif mode == "parallel":
+        builder.add_edge(script_writer, voice_actor)
+        builder.add_edge(script_writer, graphic_designer)
+        builder.add_edge(voice_actor, director)
+        builder.add_edge(graphic_designer, director)
+    else:
+        raise ValueError(f"Unknown PIPELINE_MODE: {mode!r}")
+    return builder.build()
 
 def extract_captions(text):
-    try:
-        if text.strip().startswith("```json"):
-            text = text.strip().strip("```json").strip("```")
-        data = json.loads(text)
-        return data.get("captions", [])
-    except Exception as e:
-        print("❌ Failed to extract captions:", e)
-        return []
+    """
+    Captions from the script writer's reply.
 
-# === MAIN FUNCTION ===
-async def main():
-    model_client = OpenAIChatCompletionClient(model="gemini-1.5-flash-8b") 
-    
-    script_writer = AssistantAgent(
-        name="script_writer",
-        model_client=model_client,
-        system_message='''
+    Raises:
+        ScriptValidationError: if the reply is not a valid script
+    """
+    return parse_script(text).captions
+
+# === SCRIPT WRITER ===
+SCRIPT_WRITER_PROMPT = f'''
             You are a creative assistant tasked with writing a script for a short video.
-            The script should contain exactly 5 captions (max 8 words each) in a compelling narrative.
+            The script should contain exactly {CAPTION_COUNT} captions (max {CAPTION_MAX_WORDS} words each) in a compelling narrative.
             Return response in JSON format:
-            {
+            {{
                 "topic": "topic",
                 "takeaway": "takeaway",
-                "captions": ["caption1", ..., "caption5"]
-            }
+                "captions": ["caption1", ..., "caption{CAPTION_COUNT}"]
+            }}
         '''
-    )
 
-    voice_actor = AssistantAgent(
-        name="voice_actor",
-        model_client=model_client,
-        tools=[voiceover_tool],
-        system_message=(
-            "You are only allowed to use the tool generate_voiceovers_tool. "
-            "Do not attempt to generate voiceovers yourself. "
-            "Always call the tool when asked to generate voiceovers. "
-            "Respond with 'TERMINATE' when done."
+class ValidatedScriptWriter(BaseChatAgent):
+    """
+    Script writer whose reply is always a valid script.
+
+    Invalid replies are sent back to the model with the problems listed, at
+    most ``max_repairs`` times; after that the run fails with
+    ScriptValidationError, before the voice and image nodes run.
+
+    With a speculator, the reply is streamed and every caption is handed to
+    it as soon as it is complete, so assets are requested while the model
+    is still writing.
+    """
+
+    def __init__(self, name, model_client, max_repairs=SCRIPT_MAX_REPAIRS, speculator=None):
+        super().__init__(name, description="Writes the video script as JSON.")
+        self._writer = AssistantAgent(
+            name=name, model_client=model_client, system_message=SCRIPT_WRITER_PROMPT,
+            model_client_stream=speculator is not None,
         )
-    )
+        self._max_repairs = max_repairs
+        self._speculator = speculator
+
+    @property
+    def produced_message_types(self):
+        return (TextMessage,)
+
+    async def _draft(self, messages, cancellation_token: CancellationToken) -> Response:
+        if self._speculator is None:
+            return await self._writer.on_messages(messages, cancellation_token)
+        parser = CaptionStreamParser()
+        response = None
+        async for item in self._writer.on_messages_stream(messages, cancellation_token):
+            if isinstance(item, Response):
+                response = item
+            elif isinstance(item, ModelClientStreamingChunkEvent):
+                for index, caption in parser.feed(item.content):
+                    self._speculator.dispatch(index, caption)
+        return response
 
-    graphic_designer = AssistantAgent(
-        name="graphic_designer",
-        model_client=model_client,
-        tools=[image_generation_tool],
-        system_message=(
-            "You are only allowed to use the tool generate_images_tool. "
-            "Never output JSON, summaries, or text directly. Only call the tool. "
-            "If you do not call the tool, images will not be generated. "
-            "Example: To generate images, call generate_images_tool with the captions list. "
-            "Respond with 'TERMINATE' when done."
+    async def on_messages(self, messages, cancellation_token: CancellationToken) -> Response:
+        if self._speculator is not None:
+            self._speculator.begin(job_workdir.get())
+        response = await self._draft(messages, cancellation_token)
+        inner_messages = list(response.inner_messages or [])
+        with span("script.validate", category="llm") as attrs:
+            for attempt in range(self._max_repairs + 1):
+                attrs["repairs"] = attempt
+                try:
+                    script = parse_script(response.chat_message.content)
+                    break
+                except ScriptValidationError as e:
+                    print(f"⚠️ Script rejected ({e})")
+                    if attempt == self._max_repairs:
+                        if self._speculator is not None:
+                            self._speculator.cancel_all()
+                        raise
+                    inner_messages.append(response.chat_message)
+                    response = await self._draft(
+                        [TextMessage(content=repair_prompt(e), source="user")], cancellation_token
+                    )
+        return Response(
+            chat_message=TextMessage(content=script.to_json(), source=self.name),
+            inner_messages=inner_messages,
         )
-    )
 
-    director = AssistantAgent(
-        name="director",
-        model_client=model_client,
-        tools=[video_generation_tool],
-        system_message=(
-        """"
-          You are only allowed to use the tool generate_video_tool.
-          Do not attempt to generate videos yourself. 
-          Always call the tool when asked to generate a video.
-          Respond with 'TERMINATE' when done."""
-     )
+    async def on_reset(self, cancellation_token: CancellationToken) -> None:
+        await self._writer.on_reset(cancellation_token)
+
+def create_script_writer(model_client, speculator=None):
+    return ValidatedScriptWriter(name="script_writer", model_client=model_client, speculator=speculator)
+
+TRACE_PATH = "trace.json"
+
+def print_trace_summary(tracer):
+    for name, stats in sorted(tracer.summary().items(), key=lambda item: -item[1]["total_ms"]):
+        print(f"⏱️ {name}: {stats['count']}x, total {stats['total_ms']:.0f} ms, max {stats['max_ms']:.0f} ms")
+
+# === TEAM ===
+def create_team(model_client):
+    # Voiceovers and images start while the script is still streaming in
+    speculator = Speculator() if SPECULATIVE_ASSETS else None
+    script_writer = create_script_writer(model_client, speculator)
+
+    voice_actor = ToolNode(
+        "voice_actor", generate_voiceovers_tool,
+        "Generates a voiceover for every caption with ElevenLabs.", speculator
+    )
+    graphic_designer = ToolNode(
+        "graphic_designer", generate_images_tool,
+        "Generates an image for every caption with Stability AI.", speculator
+    )
+    director = ToolNode(
+        "director", generate_video_tool,
+        "Assembles voiceovers, images and captions into the final video."
     )
 
-    # Sequential execution setup
-    builder = DiGraphBuilder()
-    builder.add_node(script_writer)
-    builder.add_node(voice_actor)
-    builder.add_node(graphic_designer)
-    builder.add_node(director)
-    builder.add_edge(script_writer, voice_actor)
-    builder.add_edge(voice_actor, graphic_designer)
-    builder.add_edge(graphic_designer, director)
-    graph = builder.build()
+    graph = build_graph(script_writer, voice_actor, graphic_designer, director)
 
-    team = GraphFlow(
+    return GraphFlow(
         participants=[script_writer, voice_actor, graphic_designer, director],
         graph=graph,
-        termination_condition=TextMentionTermination("TERMINATE"),
-        max_turns=4
+        # The run is over once the director has assembled the video
+        termination_condition=SourceMatchTermination(["director"]),
     )
 
+# === MAIN FUNCTION ===
+async def main():
+    model_client = get_model_client()
+    team = create_team(model_client)
+
     while True:
         user_input = input("Enter a message (type 'exit' to leave): ")
         if user_input.strip().lower() == "exit":
             break
 
-        stream = team.run_stream(task=user_input)
-        await Console(stream)
+        tracer = Tracer(user_input)
+        with tracing(tracer):
+            try:
+                stream = team.run_stream(task=user_input)
+                await Console(stream)
+            except Exception as e:
+                # e.g. the script stayed invalid after the repair attempts
+                print(f"❌ Run failed: {e}")
+                await team.reset()
+        print_trace_summary(tracer)
+        print("🧭 Trace written to", tracer.export(TRACE_PATH))
 
 if __name__ == "__main__":
     asyncio.run(main())
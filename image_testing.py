@@ -1,18 +1,14 @@
 from dotenv import load_dotenv
 import asyncio
 import os
-import requests
 from autogen_core.tools import FunctionTool
 from typing_extensions import Annotated
 import asyncio
 from autogen_core import CancellationToken
+from providers import stability
 
 load_dotenv()
 
-print("API Key loaded:", os.getenv("STABILITY_API_KEY"))
-
-stability_api_key = os.getenv("STABILITY_API_KEY")
-
 def generate_images(prompts: list[str]):
     """
     Generate images based on text prompts using Stability AI API.
@@ -24,36 +20,16 @@ def generate_images(prompts: list[str]):
     output_dir = "images"
     os.makedirs(output_dir, exist_ok=True)
 
-    # API config
-    stability_api_url = "https://api.stability.ai/v2beta/stable-image/generate/core"
-    headers = {
-        "Authorization": f"Bearer {stability_api_key}",
-        "Accept": "image/*"
-    }
-
     for i, prompt in enumerate(prompts, 1):
         print(f"Generating image {i}/{len(prompts)} for prompt: {prompt}")
 
         # Skip if image already exists
         image_path = os.path.join(output_dir, f"image_{i}.webp")
         if not os.path.exists(image_path):
-            # Prepare request payload
-            payload = {
-                "prompt": (None, prompt),
-                "output_format": (None, "webp"),
-                "height": (None, "1920"),
-                "width": (None, "1080"),
-                "seed": (None, str(seed))
-            }
-
             try:
-                response = requests.post(stability_api_url, headers=headers, files=payload)
-                if response.status_code == 200:
-                    with open(image_path, "wb") as image_file:
-                        image_file.write(response.content)
-                    print(f"Image saved to {image_path}")
-                else:
-                    print(f"Error generating image {i}: {response.json()}")
+                # Shared pooled session from the provider registry
+                stability.download_image(prompt, image_path, 1080, 1920, seed, "webp")
+                print(f"Image saved to {image_path}")
             except Exception as e:
                 print(f"Error generating image {i}: {e}")
 
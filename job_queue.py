@@ -0,0 +1,432 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from dataclasses import asdict, dataclass
+
+from manifest import JobManifest, manifest_path
+from providers import llm
+
+QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join("jobs", "queue.db"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_POLL_INTERVAL = 0.5  # seconds between claims when a stage has nothing to do
+
+# Stage -> stages whose checkpoints it needs
+STAGES = {
+    "script": (),
+    "tts": ("script",),
+    "image": ("script",),
+    "render": ("tts", "image"),
+}
+DEFAULT_WORKERS = {"script": 2, "tts": 2, "image": 2, "render": 1}
+
+# Matches a task only while ``worker`` still holds an unexpired lease on it;
+# bound as (job_id, stage, worker, now)
+LEASE_HELD = "job_id = ? AND stage = ? AND worker = ? AND status = 'running' AND lease_until > ?"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    topic TEXT NOT NULL,
+    workdir TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    job_id TEXT NOT NULL REFERENCES jobs(id),
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    output TEXT,
+    error TEXT,
+    worker TEXT,
+    lease_until REAL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (job_id, stage)
+);
+CREATE INDEX IF NOT EXISTS tasks_by_stage ON tasks (stage, status);
+"""
+
+
+class LeaseLostError(RuntimeError):
+    """The task's lease ran out and the task was handed to another worker."""
+
+
+@dataclass
+class Task:
+    job_id: str
+    stage: str
+    topic: str
+    workdir: str
+    attempts: int
+    inputs: dict  # merged checkpoints of the job's finished stages
+    worker: str  # lease holder; only it may renew, complete or fail the task
+
+
+class JobQueue:
+    """
+    Durable job queue in a SQLite file.
+
+    Every job is split into one task per stage. A task becomes claimable
+    once the stages it depends on have checkpointed their output, so a job
+    that fails at one stage resumes there on retry. Claims are leases: if a
+    worker dies, its task is handed out again when the lease runs out, until
+    the task has used up its attempts.
+    """
+
+    def __init__(self, path: str = QUEUE_PATH, max_attempts: int = JOB_MAX_ATTEMPTS,
+                 lease_seconds: float = JOB_LEASE_SECONDS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def submit(self, topic: str, job_id: str | None = None, out_dir: str = "jobs") -> str:
+        job_id = re.sub(r"[^A-Za-z0-9_.-]", "_", job_id or uuid.uuid4().hex[:12])
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "INSERT INTO jobs (id, topic, workdir, status, created, updated) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, topic, os.path.join(out_dir, job_id), now, now),
+            )
+            db.executemany(
+                "INSERT INTO tasks (job_id, stage, status, updated) VALUES (?, ?, 'pending', ?)",
+                [(job_id, stage, now) for stage in STAGES],
+            )
+            db.execute("COMMIT")
+        return job_id
+
+    def claim(self, stage: str, worker: str) -> Task | None:
+        """Lease the oldest runnable task of ``stage``, or return None if there is none."""
+        deps = STAGES[stage]
+        ready = " AND ".join(
+            f"EXISTS (SELECT 1 FROM tasks d WHERE d.job_id = t.job_id AND d.stage = '{dep}' AND d.status = 'done')"
+            for dep in deps
+        ) or "1"
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            self._fail_abandoned(db, stage, now)
+            row = db.execute(
+                f"""SELECT t.job_id, t.attempts, j.topic, j.workdir FROM tasks t JOIN jobs j ON j.id = t.job_id
+                    WHERE t.stage = ? AND (t.status = 'pending' OR (t.status = 'running' AND t.lease_until < ?))
+                      AND j.status != 'failed' AND {ready}
+                    ORDER BY j.created LIMIT 1""",
+                (stage, now),
+            ).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            db.execute(
+                "UPDATE tasks SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, updated = ? "
+                "WHERE job_id = ? AND stage = ?",
+                (worker, now + self.lease_seconds, now, row["job_id"], stage),
+            )
+            db.execute("UPDATE jobs SET status = 'running', updated = ? WHERE id = ?", (now, row["job_id"]))
+            inputs = {}
+            for (output,) in db.execute(
+                "SELECT output FROM tasks WHERE job_id = ? AND status = 'done'", (row["job_id"],)
+            ):
+                inputs.update(json.loads(output))
+            db.execute("COMMIT")
+        return Task(row["job_id"], stage, row["topic"], row["workdir"], row["attempts"] + 1, inputs, worker)
+
+    def _fail_abandoned(self, db: sqlite3.Connection, stage: str, now: float):
+        """
+        Fail the tasks of ``stage`` whose lease ran out on their last attempt
+        (a worker that keeps crashing on them), instead of leasing them again.
+        Caller holds a write transaction.
+        """
+        abandoned = db.execute(
+            "SELECT job_id, attempts FROM tasks "
+            "WHERE stage = ? AND status = 'running' AND lease_until < ? AND attempts >= ?",
+            (stage, now, self.max_attempts),
+        ).fetchall()
+        for job_id, attempts in abandoned:
+            error = f"lease expired on attempt {attempts}; the worker never finished"
+            db.execute(
+                "UPDATE tasks SET status = 'failed', error = ?, lease_until = NULL, updated = ? "
+                "WHERE job_id = ? AND stage = ?",
+                (error, now, job_id, stage),
+            )
+            db.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                (f"{stage}: {error}", now, job_id),
+            )
+
+    def renew(self, task: Task) -> bool:
+        """
+        Extend the lease of a task that is still being worked on.
+
+        Returns:
+            False if the lease was already lost
+        """
+        now = time.time()
+        with closing(self._connect()) as db:
+            return db.execute(
+                f"UPDATE tasks SET lease_until = ? WHERE {LEASE_HELD}",
+                (now + self.lease_seconds, task.job_id, task.stage, task.worker, now),
+            ).rowcount > 0
+
+    def complete(self, task: Task, output: dict):
+        """
+        Checkpoint a stage's output; the job is done once every stage is.
+
+        Raises:
+            LeaseLostError: if the lease ran out; the output is discarded
+        """
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            updated = db.execute(
+                "UPDATE tasks SET status = 'done', output = ?, error = NULL, lease_until = NULL, updated = ? "
+                f"WHERE {LEASE_HELD}",
+                (json.dumps(output, ensure_ascii=False), now, task.job_id, task.stage, task.worker, now),
+            ).rowcount
+            if updated == 0:
+                db.execute("ROLLBACK")
+                raise LeaseLostError(f"{task.stage} of job {task.job_id} is no longer leased to {task.worker}")
+            (remaining,) = db.execute(
+                "SELECT COUNT(*) FROM tasks WHERE job_id = ? AND status != 'done'", (task.job_id,)
+            ).fetchone()
+            if remaining == 0:
+                db.execute("UPDATE jobs SET status = 'done', updated = ? WHERE id = ?", (now, task.job_id))
+            db.execute("COMMIT")
+
+    def fail(self, task: Task, error: str):
+        """
+        Put the task back in the queue, or fail the job once its attempts are used up.
+
+        Raises:
+            LeaseLostError: if the lease ran out; the task belongs to another worker now
+        """
+        now = time.time()
+        exhausted = task.attempts >= self.max_attempts
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            updated = db.execute(
+                f"UPDATE tasks SET status = ?, error = ?, lease_until = NULL, updated = ? WHERE {LEASE_HELD}",
+                ("failed" if exhausted else "pending", error, now, task.job_id, task.stage, task.worker, now),
+            ).rowcount
+            if updated == 0:
+                db.execute("ROLLBACK")
+                raise LeaseLostError(f"{task.stage} of job {task.job_id} is no longer leased to {task.worker}")
+            if exhausted:
+                db.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                    (f"{task.stage}: {error}", now, task.job_id),
+                )
+            db.execute("COMMIT")
+
+    def retry(self, job_id: str) -> int:
+        """
+        Requeue the failed stages of a job; stages that finished keep their checkpoints.
+
+        Returns:
+            Number of stages requeued
+        """
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            requeued = db.execute(
+                "UPDATE tasks SET status = 'pending', attempts = 0, error = NULL, updated = ? "
+                "WHERE job_id = ? AND status = 'failed'",
+                (now, job_id),
+            ).rowcount
+            db.execute("UPDATE jobs SET status = 'queued', error = NULL, updated = ? WHERE id = ?", (now, job_id))
+            db.execute("COMMIT")
+        return requeued
+
+    def status(self, job_id: str) -> dict | None:
+        with closing(self._connect()) as db:
+            job = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            tasks = db.execute(
+                "SELECT stage, status, attempts, output, error FROM tasks WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        record = dict(job)
+        record["stages"] = {
+            task["stage"]: {
+                "status": task["status"],
+                "attempts": task["attempts"],
+                "output": json.loads(task["output"]) if task["output"] else None,
+                "error": task["error"],
+            }
+            for task in tasks
+        }
+        return record
+
+    def jobs(self) -> list[dict]:
+        with closing(self._connect()) as db:
+            return [dict(row) for row in db.execute("SELECT id, topic, status, error FROM jobs ORDER BY created")]
+
+
+# === STAGES ===
+async def run_script(task: Task, model_client) -> dict:
+    from elevenlab_test import create_script_writer, extract_captions
+
+    result = await create_script_writer(model_client).run(task=task.topic)
+    return {"captions": extract_captions(result.messages[-1].content)}
+
+
+async def run_tts(task: Task, model_client) -> dict:
+    from tools import generate_voiceovers
+
+    captions = task.inputs["captions"]
+    voiceovers = await generate_voiceovers(captions, output_dir=os.path.join(task.workdir, "voiceovers"))
+    return {"voiceovers": [asdict(voiceover) for voiceover in voiceovers]}
+
+
+async def run_image(task: Task, model_client) -> dict:
+    from tools import caption_to_prompt, generate_images
+
+    prompts = [caption_to_prompt(caption) for caption in task.inputs["captions"]]
+    images = await asyncio.to_thread(generate_images, prompts, output_dir=os.path.join(task.workdir, "images"))
+    return {"images": [asdict(image) for image in images]}
+
+
+async def run_render(task: Task, model_client) -> dict:
+    from render import SCENES_DIR, render_video
+
+    # The tts and image checkpoints are the two halves of the job manifest
+    manifest = JobManifest.from_dict(task.inputs)
+    manifest.save(manifest_path(task.workdir))
+    video_path = await asyncio.to_thread(
+        render_video, manifest,
+        os.path.join(task.workdir, "final_output.mp4"), scenes_dir=os.path.join(task.workdir, SCENES_DIR),
+    )
+    return {"video_path": video_path}
+
+
+STAGE_HANDLERS = {"script": run_script, "tts": run_tts, "image": run_image, "render": run_render}
+
+
+class JobService:
+    """
+    Worker pools draining a JobQueue, one pool per stage, each sized
+    independently so the bottleneck stage can be given more workers.
+    """
+
+    def __init__(self, queue: JobQueue, workers: dict[str, int] | None = None, model_client=None):
+        self.queue = queue
+        self.workers = {**DEFAULT_WORKERS, **(workers or {})}
+        self._model_client = model_client
+        self._stopping = asyncio.Event()
+
+    async def _heartbeat(self, task: Task):
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            if not await asyncio.to_thread(self.queue.renew, task):
+                print(f"⚠️ [{task.worker}] lost the lease on {task.stage} for job {task.job_id}")
+                return
+
+    async def _worker(self, stage: str, worker: str, exit_when_idle: bool):
+        handler = STAGE_HANDLERS[stage]
+        while not self._stopping.is_set():
+            task = await asyncio.to_thread(self.queue.claim, stage, worker)
+            if task is None:
+                if exit_when_idle and await asyncio.to_thread(self._idle):
+                    return
+                await asyncio.sleep(JOB_POLL_INTERVAL)
+                continue
+
+            print(f"▶️ [{worker}] {stage} for job {task.job_id} (attempt {task.attempts})")
+            os.makedirs(task.workdir, exist_ok=True)
+            heartbeat = asyncio.create_task(self._heartbeat(task))
+            try:
+                try:
+                    output = await handler(task, self._model_client)
+                except Exception as e:
+                    print(f"❌ [{worker}] {stage} failed for job {task.job_id}: {e}")
+                    await asyncio.to_thread(self.queue.fail, task, f"{type(e).__name__}: {e}")
+                else:
+                    await asyncio.to_thread(self.queue.complete, task, output)
+                    print(f"✅ [{worker}] {stage} done for job {task.job_id}")
+            except LeaseLostError as e:
+                # Another worker has the task now; its result is the one that counts
+                print(f"⚠️ [{worker}] {e}; dropping this attempt")
+            finally:
+                heartbeat.cancel()
+
+    def _idle(self) -> bool:
+        return not any(job["status"] in ("queued", "running") for job in self.queue.jobs())
+
+    async def run(self, exit_when_idle: bool = False):
+        """Run every pool until stopped (or, with ``exit_when_idle``, until no job is left to run)."""
+        owns_client = self._model_client is None
+        self._model_client = self._model_client or llm.get_model_client()
+        host = socket.gethostname()
+        try:
+            await asyncio.gather(*[
+                self._worker(stage, f"{host}-{os.getpid()}-{stage}-{n}", exit_when_idle)
+                for stage, count in self.workers.items()
+                for n in range(count)
+            ])
+        finally:
+            if owns_client:
+                await llm.close()
+
+    def stop(self):
+        self._stopping.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Durable job queue for generating shorts.")
+    parser.add_argument("--queue", default=QUEUE_PATH, help="SQLite file holding the queue")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="Queue a topic")
+    submit.add_argument("topic")
+    submit.add_argument("--id", default=None)
+    submit.add_argument("--out-dir", default="jobs")
+
+    work = commands.add_parser("work", help="Run the stage worker pools")
+    for stage, count in DEFAULT_WORKERS.items():
+        work.add_argument(f"--{stage}", type=int, default=count, help=f"Workers for the {stage} stage")
+    work.add_argument("--exit-when-idle", action="store_true", help="Stop once no job is queued or running")
+
+    status = commands.add_parser("status", help="Show one job, or all jobs")
+    status.add_argument("job_id", nargs="?")
+
+    retry = commands.add_parser("retry", help="Resume a failed job from its failed stages")
+    retry.add_argument("job_id")
+
+    args = parser.parse_args()
+    queue = JobQueue(args.queue)
+
+    if args.command == "submit":
+        print(queue.submit(args.topic, args.id, args.out_dir))
+    elif args.command == "work":
+        service = JobService(queue, {stage: getattr(args, stage) for stage in STAGES})
+        asyncio.run(service.run(exit_when_idle=args.exit_when_idle))
+    elif args.command == "status":
+        if args.job_id:
+            print(json.dumps(queue.status(args.job_id), indent=2, ensure_ascii=False))
+        else:
+            for job in queue.jobs():
+                print(f"{job['id']}  {job['status']:<8} {job['topic']}" + (f"  ({job['error']})" if job["error"] else ""))
+    elif args.command == "retry":
+        print(f"🔁 Requeued {queue.retry(args.job_id)} stage(s) of {args.job_id}")
+
+
+if __name__ == "__main__":
+    main()
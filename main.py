@@ -1,6 +1,6 @@
 import asyncio
 from autogen_core.models import UserMessage
-from autogen_ext.models.openai import OpenAIChatCompletionClient
+from providers.llm import get_model_client
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.teams import RoundRobinGroupChat
 from autogen_agentchat.conditions import TextMentionTermination
@@ -10,7 +10,7 @@ import os
 from dotenv import load_dotenv
 
 async def main() -> None:
-    model_client=OpenAIChatCompletionClient(model="gemini-1.5-flash-8b")
+    model_client=get_model_client()
 
     async def get_weather(location:str) -> str:
         return f"The weather in {location} is sunny"  
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+
+from asset_cache import file_digest
+from audio_probe import probe_duration
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Voice and image stages of one job may record their assets at the same time
+_update_lock = threading.Lock()
+
+
+class ManifestError(RuntimeError):
+    """The manifest is missing assets, or its files changed since they were recorded."""
+
+
+@dataclass(frozen=True)
+class AudioAsset:
+    path: str
+    sha256: str
+    bytes: int
+    duration: float  # seconds
+    backend: str | None = None
+
+    @classmethod
+    def from_file(cls, path: str, backend: str | None = None) -> "AudioAsset":
+        """Hash and measure a voiceover once, where it is produced."""
+        digest = file_digest(path)
+        return cls(path, digest, os.path.getsize(path), probe_duration(path, digest), backend)
+
+
+@dataclass(frozen=True)
+class ImageAsset:
+    path: str
+    sha256: str
+    bytes: int
+    width: int
+    height: int
+    backend: str | None = None
+
+    @classmethod
+    def from_file(cls, path: str, backend: str | None = None) -> "ImageAsset":
+        """Hash an image and read its size from the header, once, where it is produced."""
+        from PIL import Image
+
+        with Image.open(path) as img:
+            width, height = img.size
+        return cls(path, file_digest(path), os.path.getsize(path), width, height, backend)
+
+
+@dataclass
+class JobManifest:
+    """
+    The assets of one job, per scene and in caption order.
+
+    The voice and image stages fill in their halves; the renderer reads
+    paths, hashes and durations from here instead of scanning directories
+    or probing files again.
+    """
+    captions: list[str]
+    voiceovers: list[AudioAsset | None] = field(default_factory=list)
+    images: list[ImageAsset | None] = field(default_factory=list)
+
+    def __post_init__(self):
+        count = len(self.captions)
+        self.voiceovers = (list(self.voiceovers) + [None] * count)[:count]
+        self.images = (list(self.images) + [None] * count)[:count]
+
+    def check(self, captions: list[str]):
+        """
+        Raises:
+            ManifestError: if the manifest was recorded for other captions
+        """
+        if self.captions != list(captions):
+            raise ManifestError("the manifest was recorded for different captions; regenerate the assets")
+
+    def scenes(self) -> list[tuple[ImageAsset, AudioAsset, str]]:
+        """
+        ``(image, voiceover, caption)`` for every scene, in order. Every file
+        is checked against the size and hash it was recorded with, since the
+        hashes also key the rendered segments.
+
+        Raises:
+            ManifestError: if an asset is missing or its file has changed
+        """
+        errors = []
+        for i, (image, voice) in enumerate(zip(self.images, self.voiceovers), 1):
+            for kind, asset in (("image", image), ("voiceover", voice)):
+                if asset is None:
+                    errors.append(f"scene {i} has no {kind}")
+                elif (not os.path.exists(asset.path) or os.path.getsize(asset.path) != asset.bytes
+                      or file_digest(asset.path) != asset.sha256):
+                    errors.append(f"scene {i} {kind} changed since it was recorded: {asset.path}")
+        if errors:
+            raise ManifestError("; ".join(errors))
+        return list(zip(self.images, self.voiceovers, self.captions))
+
+    def to_dict(self) -> dict:
+        return {
+            "version": MANIFEST_VERSION,
+            "captions": self.captions,
+            "voiceovers": [asdict(a) if a else None for a in self.voiceovers],
+            "images": [asdict(a) if a else None for a in self.images],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "JobManifest":
+        if data.get("version", MANIFEST_VERSION) != MANIFEST_VERSION:
+            raise ManifestError(f"unsupported manifest version {data.get('version')!r}")
+        return cls(
+            captions=list(data["captions"]),
+            voiceovers=[AudioAsset(**a) if a else None for a in data.get("voiceovers", [])],
+            images=[ImageAsset(**a) if a else None for a in data.get("images", [])],
+        )
+
+    def save(self, path: str):
+        """Write atomically, so a reader never sees half a manifest."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+def manifest_path(workdir: str) -> str:
+    return os.path.join(workdir, MANIFEST_NAME)
+
+
+def load_manifest(workdir: str, captions: list[str] | None = None) -> JobManifest:
+    """
+    Read the job's manifest; with ``captions``, also check it was recorded for them.
+
+    Raises:
+        ManifestError: if the job has no readable manifest, or it is for other captions
+    """
+    try:
+        with open(manifest_path(workdir), encoding="utf-8") as f:
+            manifest = JobManifest.from_dict(json.load(f))
+    except FileNotFoundError:
+        raise ManifestError(f"no {MANIFEST_NAME} in {workdir}; run the voice and image stages first") from None
+    except (ValueError, KeyError, TypeError) as e:
+        raise ManifestError(f"unreadable {MANIFEST_NAME} in {workdir} ({e})") from None
+    if captions is not None:
+        manifest.check(captions)
+    return manifest
+
+
+def record_assets(workdir: str, captions: list[str], voiceovers: list[AudioAsset] | None = None,
+                  images: list[ImageAsset] | None = None) -> JobManifest:
+    """
+    Store one stage's assets in the job's manifest. A manifest written for
+    different captions (an earlier run in the same directory) is replaced.
+    """
+    with _update_lock:
+        try:
+            manifest = load_manifest(workdir, captions)
+        except ManifestError:
+            manifest = JobManifest(list(captions))
+        if voiceovers is not None:
+            manifest.voiceovers = list(voiceovers)
+        if images is not None:
+            manifest.images = list(images)
+        os.makedirs(workdir, exist_ok=True)
+        manifest.save(manifest_path(workdir))
+        return manifest
@@ -0,0 +1,198 @@
+import json
+import os
+import tempfile
+import time
+from typing import AsyncGenerator, Sequence
+
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage
+
+from asset_cache import AssetCache, llm_cache, llm_cache_key
+from tracing import span
+
+# "cache": reuse stored responses younger than LLM_CACHE_TTL, call the model otherwise
+# "record": always call the model and store the response
+# "replay": answer only from stored responses (ignoring age); a miss is an error
+# "off": no caching
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "cache")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # seconds, 0 = never expire
+
+
+class _WrappingChatCompletionClient(ChatCompletionClient):
+    """Forwards everything but ``create``/``create_stream`` to ``self._inner``."""
+
+    def __init__(self, inner: ChatCompletionClient):
+        self._inner = inner
+
+    async def close(self) -> None:
+        await self._inner.close()
+
+    def actual_usage(self):
+        return self._inner.actual_usage()
+
+    def total_usage(self):
+        return self._inner.total_usage()
+
+    def count_tokens(self, messages: Sequence[LLMMessage], **kwargs) -> int:
+        return self._inner.count_tokens(messages, **kwargs)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], **kwargs) -> int:
+        return self._inner.remaining_tokens(messages, **kwargs)
+
+    @property
+    def capabilities(self):
+        return self._inner.capabilities
+
+    @property
+    def model_info(self):
+        return self._inner.model_info
+
+
+class TracingChatCompletionClient(_WrappingChatCompletionClient):
+    """Wraps a model client and records a span for every model call."""
+
+    def _record_usage(self, attrs: dict, result: CreateResult):
+        attrs["prompt_tokens"] = result.usage.prompt_tokens
+        attrs["completion_tokens"] = result.usage.completion_tokens
+        attrs["cached"] = result.cached
+        attrs["tool_call"] = not isinstance(result.content, str)
+
+    async def create(self, messages: Sequence[LLMMessage], **kwargs) -> CreateResult:
+        with span("llm.create", category="llm", messages=len(messages)) as attrs:
+            result = await self._inner.create(messages, **kwargs)
+            self._record_usage(attrs, result)
+            return result
+
+    async def create_stream(self, messages: Sequence[LLMMessage], **kwargs) -> AsyncGenerator[str | CreateResult, None]:
+        with span("llm.create_stream", category="llm", messages=len(messages)) as attrs:
+            async for item in self._inner.create_stream(messages, **kwargs):
+                if isinstance(item, CreateResult):
+                    self._record_usage(attrs, item)
+                yield item
+
+
+class ProviderChatCompletionClient(_WrappingChatCompletionClient):
+    """
+    Model client backed by a registry provider: every call holds one of the
+    provider's slots and updates its health, and the underlying client (with
+    its connection pool) is shared by everyone using the provider.
+    """
+
+    def __init__(self, provider):
+        self._provider = provider
+
+    @property
+    def _inner(self) -> ChatCompletionClient:
+        return self._provider.client
+
+    async def create(self, messages: Sequence[LLMMessage], **kwargs) -> CreateResult:
+        async with self._provider.async_slot() as client:
+            return await client.create(messages, **kwargs)
+
+    async def create_stream(self, messages: Sequence[LLMMessage], **kwargs) -> AsyncGenerator[str | CreateResult, None]:
+        async with self._provider.async_slot() as client:
+            async for item in client.create_stream(messages, **kwargs):
+                yield item
+
+    async def close(self):
+        """Close the shared client, if one was ever created."""
+        client = self._provider.take_client()
+        if client is not None:
+            await client.close()
+
+
+class CacheMissError(LookupError):
+    """Replay mode was asked for a response that was never recorded."""
+
+
+def _normalize_message(message: LLMMessage) -> dict:
+    data = message.model_dump(mode="json")
+    if isinstance(data.get("content"), str):
+        data["content"] = data["content"].strip()
+    return data
+
+
+class CachingChatCompletionClient(_WrappingChatCompletionClient):
+    """
+    Answers repeated requests from a disk cache instead of the model.
+
+    Requests are keyed on the normalised message list, the tool schemas and
+    the remaining create options; entries expire after ``ttl`` seconds and
+    the cache itself is LRU-bounded. See ``LLM_CACHE_MODE`` for the modes.
+    """
+
+    def __init__(self, inner: ChatCompletionClient, namespace: str, cache: AssetCache = llm_cache,
+                 mode: str = LLM_CACHE_MODE, ttl: float = LLM_CACHE_TTL):
+        if mode not in ("cache", "record", "replay", "off"):
+            raise ValueError(f"Unknown LLM_CACHE_MODE: {mode!r}")
+        super().__init__(inner)
+        self._namespace = namespace
+        self._cache = cache
+        self._mode = mode
+        self._ttl = ttl
+
+    def _key(self, messages: Sequence[LLMMessage], kwargs: dict) -> str:
+        tools = [tool.schema if hasattr(tool, "schema") else tool for tool in kwargs.get("tools") or ()]
+        options = {name: value for name, value in kwargs.items() if name not in ("tools", "cancellation_token")}
+        request = json.dumps(
+            {"messages": [_normalize_message(m) for m in messages], "tools": tools, "options": options},
+            sort_keys=True, ensure_ascii=False, default=repr,
+        )
+        return llm_cache_key(self._namespace, request)
+
+    def _load(self, key: str) -> CreateResult | None:
+        path = self._cache.path_for(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._mode != "replay" and self._ttl and time.time() - entry["created"] > self._ttl:
+            return None
+        return CreateResult.model_validate(entry["result"]).model_copy(update={"cached": True})
+
+    def _store(self, key: str, result: CreateResult):
+        entry = {"created": time.time(), "result": result.model_dump(mode="json")}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "response.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            self._cache.store(key, path)
+
+    def _lookup(self, key: str) -> CreateResult | None:
+        if self._mode in ("cache", "replay"):
+            cached = self._load(key)
+            if cached is not None:
+                return cached
+            if self._mode == "replay":
+                raise CacheMissError(f"No recorded response for request {key[:12]}")
+        return None
+
+    async def create(self, messages: Sequence[LLMMessage], **kwargs) -> CreateResult:
+        if self._mode == "off":
+            return await self._inner.create(messages, **kwargs)
+        key = self._key(messages, kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        result = await self._inner.create(messages, **kwargs)
+        self._store(key, result)
+        return result
+
+    async def create_stream(self, messages: Sequence[LLMMessage], **kwargs) -> AsyncGenerator[str | CreateResult, None]:
+        if self._mode == "off":
+            async for item in self._inner.create_stream(messages, **kwargs):
+                yield item
+            return
+        key = self._key(messages, kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            if isinstance(cached.content, str):
+                yield cached.content
+            yield cached
+            return
+        async for item in self._inner.create_stream(messages, **kwargs):
+            if isinstance(item, CreateResult):
+                self._store(key, item)
+            yield item
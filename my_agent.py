@@ -1,4 +1,5 @@
 from elevenlab_test import generate_video_tool
+from manifest import AudioAsset, ImageAsset, record_assets
 
 stub_captions = [
     "Emerald waters, sun-kissed sands.",
@@ -8,5 +9,15 @@ stub_captions = [
     "Your island escape is now."
 ]
 
-result = generate_video_tool(stub_captions)
-print(result)
\ No newline at end of file
+# The render pool spawns workers that re-import __main__
+if __name__ == "__main__":
+    # Render from the assets already on disk, named by scene number
+    scenes = range(1, len(stub_captions) + 1)
+    record_assets(
+        ".", stub_captions,
+        voiceovers=[AudioAsset.from_file(f"voiceovers/voiceover_{i}.mp3") for i in scenes],
+        images=[ImageAsset.from_file(f"images/image_{i}.webp") for i in scenes],
+    )
+
+    result = generate_video_tool(stub_captions)
+    print(result)
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+from dataclasses import dataclass
+
+from tools import (
+    IMAGE_MAX_CONCURRENCY,
+    TTS_MAX_CONCURRENCY,
+    caption_to_prompt,
+    generate_image,
+    generate_voiceover,
+)
+from manifest import record_assets
+from script_schema import ScriptValidationError
+from tracing import span
+from render import (
+    RENDER_WORKERS, SCENES_DIR, get_render_pool, pooled_encoder, render_scene, stitch_scenes
+)
+
+RENDER_MAX_CONCURRENCY = int(os.getenv("RENDER_MAX_CONCURRENCY", str(RENDER_WORKERS)))
+
+
+@dataclass
+class ProviderLimits:
+    """
+    Concurrency caps per external provider. Share one instance between
+    concurrent jobs to make the caps global rather than per job.
+    """
+    tts: asyncio.Semaphore
+    image: asyncio.Semaphore
+    render: asyncio.Semaphore
+
+    @classmethod
+    def create(cls, tts: int = TTS_MAX_CONCURRENCY, image: int = IMAGE_MAX_CONCURRENCY,
+               render: int = RENDER_MAX_CONCURRENCY) -> "ProviderLimits":
+        return cls(asyncio.Semaphore(tts), asyncio.Semaphore(image), asyncio.Semaphore(render))
+
+
+async def produce_short(captions: list[str], workdir: str = ".",
+                        limits: ProviderLimits | None = None) -> str:
+    """
+    Produce a short from captions with voiceovers, images and rendering overlapped.
+
+    Each scene's voiceover and image are requested concurrently, and the
+    scene is rendered as soon as both of its assets are ready, so wall-clock
+    time approaches max(TTS, images) + render instead of their sum.
+
+    Args:
+        captions: Captions for the video, one per scene
+        workdir: Job directory; assets and the final video are written under it
+        limits: Provider concurrency caps, possibly shared with other jobs
+
+    Returns:
+        Path of the final video
+
+    Raises:
+        ScriptValidationError: if there are no captions
+    """
+    if not captions:
+        raise ScriptValidationError(["no captions to produce a video from"])
+    voices_dir = os.path.join(workdir, "voiceovers")
+    images_dir = os.path.join(workdir, "images")
+    scenes_dir = os.path.join(workdir, SCENES_DIR)
+    for path in (voices_dir, images_dir, scenes_dir):
+        os.makedirs(path, exist_ok=True)
+
+    total = len(captions)
+    limits = limits or ProviderLimits.create()
+
+    async def image(i: int, caption: str):
+        async with limits.image:
+            return await asyncio.to_thread(generate_image, i, total, caption_to_prompt(caption), images_dir)
+
+    async def scene(i: int, caption: str):
+        voice, image_asset = await asyncio.gather(
+            generate_voiceover(i, total, caption, limits.tts, voices_dir),
+            image(i, caption),
+        )
+        async with limits.render:
+            scene_path = await asyncio.to_thread(
+                render_scene, image_asset, voice, caption,
+                os.path.join(scenes_dir, f"scene_{i}.mp4"),
+                encoder=pooled_encoder(), executor=get_render_pool(),
+            )
+        return voice, image_asset, scene_path
+
+    with span("scenes", category="pipeline", scenes=total):
+        voices, images, scene_paths = zip(*await asyncio.gather(
+            *[scene(i, caption) for i, caption in enumerate(captions, 1)]
+        ))
+    record_assets(workdir, captions, voiceovers=voices, images=images)
+    return await asyncio.to_thread(stitch_scenes, scene_paths, os.path.join(workdir, "final_output.mp4"))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python pipeline.py \"caption 1\" \"caption 2\" ...")
+        sys.exit(1)
+    asyncio.run(produce_short(sys.argv[1:]))
@@ -0,0 +1,3 @@
+# Clients for the external backends. Each provider module imports its SDK
+# and builds its client on first use, so importing tools.py stays cheap for
+# runs (and worker processes) that never touch a given backend.
@@ -0,0 +1,35 @@
+import os
+
+from providers.registry import registry
+from streaming import StreamStats, stream_to_file
+
+
+def _create_client():
+    from elevenlabs import ElevenLabs
+    return ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+
+
+provider = registry.register("tts", _create_client, int(os.getenv("TTS_MAX_CONCURRENCY", "4")))
+
+
+def get_client():
+    """The shared ElevenLabs client, created on first use."""
+    return provider.client
+
+
+def set_client(client):
+    """Replace the client, e.g. with a local stand-in for benchmarks."""
+    provider.set_client(client)
+
+
+def synthesize_to_file(text: str, voice_id: str, model_id: str, output_format: str,
+                       save_file_path: str) -> StreamStats:
+    """Synthesize ``text`` and stream the audio straight to ``save_file_path``; blocking."""
+    with provider.slot() as client:
+        response = client.text_to_speech.convert(
+            text=text,
+            voice_id=voice_id,
+            model_id=model_id,
+            output_format=output_format,
+        )
+        return stream_to_file(response, save_file_path)
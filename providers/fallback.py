@@ -0,0 +1,66 @@
+from dataclasses import dataclass
+from typing import Callable
+
+from concurrency import hedged_call, retry_call
+
+
+@dataclass
+class Backend:
+    """
+    One way of producing an asset file, tried in order by :func:`call_with_fallback`.
+
+    ``call(path)`` writes the asset to ``path``. ``provider`` is the registry
+    entry whose circuit breaker and latency history apply, or None for local
+    backends that cannot be overloaded.
+    """
+    name: str
+    call: Callable[[str], object]
+    provider: object = None
+    hedge_after: float | None = None  # default deadline until the provider has a p95
+    attempts: int = 1
+    cacheable: bool = True  # False for stand-ins that must not be served as the real asset
+
+
+@dataclass
+class FallbackResult:
+    backend: Backend
+    result: object
+    hedged: bool
+
+
+def _deadline(backend: Backend) -> float | None:
+    if backend.provider is None or backend.hedge_after is None:
+        return None
+    p95 = backend.provider.health.p95_latency
+    return p95 if p95 is not None else backend.hedge_after
+
+
+def call_with_fallback(backends: list[Backend], output_path: str) -> FallbackResult:
+    """
+    Write an asset to ``output_path`` with the first backend that succeeds.
+
+    Backends whose circuit is open are skipped. Calls to remote backends are
+    hedged: if one has not answered by the provider's p95 latency after
+    going in flight, a duplicate request is sent (when the provider has a
+    free slot) and the first response wins.
+
+    Raises:
+        RuntimeError: if every backend failed or was skipped
+    """
+    errors = []
+    for backend in backends:
+        if backend.provider is not None and not backend.provider.available():
+            errors.append(f"{backend.name}: circuit open")
+            continue
+        try:
+            has_capacity = backend.provider.has_free_slot if backend.provider is not None else None
+            result, sent = retry_call(
+                hedged_call, backend.call, output_path, _deadline(backend), has_capacity,
+                attempts=backend.attempts,
+            )
+        except Exception as e:
+            errors.append(f"{backend.name}: {e}")
+            print(f"⚠️ {backend.name} failed ({e})")
+            continue
+        return FallbackResult(backend, result, hedged=sent > 1)
+    raise RuntimeError("All backends failed: " + "; ".join(errors))
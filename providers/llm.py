@@ -0,0 +1,46 @@
+import os
+import threading
+
+from providers.registry import registry
+
+MODEL_NAME = "gemini-1.5-flash-8b"
+
+
+def _create_client():
+    from autogen_ext.models.openai import OpenAIChatCompletionClient
+    return OpenAIChatCompletionClient(model=MODEL_NAME)
+
+
+provider = registry.register("llm", _create_client, int(os.getenv("LLM_MAX_CONCURRENCY", "4")))
+
+_model_client = None
+_model_client_lock = threading.Lock()
+
+
+def get_model_client():
+    """
+    The model client shared by every agent in this process: one connection
+    pool, the provider's concurrency limit and health tracking, the response
+    cache (see ``LLM_CACHE_MODE``), and tracing.
+    """
+    global _model_client
+    with _model_client_lock:
+        if _model_client is None:
+            from model_clients import (
+                CachingChatCompletionClient, ProviderChatCompletionClient, TracingChatCompletionClient
+            )
+            _model_client = TracingChatCompletionClient(
+                CachingChatCompletionClient(ProviderChatCompletionClient(provider), namespace=MODEL_NAME)
+            )
+        return _model_client
+
+
+async def close():
+    """Close the shared model client's connections; call once at process exit."""
+    global _model_client
+    with _model_client_lock:
+        client, _model_client = _model_client, None
+    if client is not None:
+        # Also detaches the provider's client, so the next get_model_client()
+        # starts from a fresh connection pool
+        await client.close()
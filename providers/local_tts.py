@@ -0,0 +1,34 @@
+import os
+import shutil
+import subprocess
+import time
+
+from streaming import StreamStats
+
+# Offline speech synthesizer used when ElevenLabs is unavailable
+LOCAL_TTS_COMMAND = os.getenv("LOCAL_TTS_COMMAND") or shutil.which("espeak-ng") or shutil.which("espeak")
+
+
+def available() -> bool:
+    return bool(LOCAL_TTS_COMMAND)
+
+
+def synthesize_to_file(text: str, save_file_path: str) -> StreamStats:
+    """Speak ``text`` with the local engine and encode it to ``save_file_path`` (MP3); blocking."""
+    from moviepy.config import get_setting
+
+    if not available():
+        raise RuntimeError("No local TTS engine found (set LOCAL_TTS_COMMAND or install espeak-ng)")
+    started = time.monotonic()
+    wav_path = f"{save_file_path}.wav"
+    try:
+        subprocess.run([LOCAL_TTS_COMMAND, "-w", wav_path, text], check=True, capture_output=True)
+        subprocess.run(
+            [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error", "-i", wav_path, save_file_path],
+            check=True, capture_output=True,
+        )
+    finally:
+        if os.path.exists(wav_path):
+            os.remove(wav_path)
+    elapsed = time.monotonic() - started
+    return StreamStats(save_file_path, os.path.getsize(save_file_path), elapsed, elapsed)
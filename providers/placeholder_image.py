@@ -0,0 +1,28 @@
+import hashlib
+import os
+import time
+
+from streaming import StreamStats
+
+
+def _colour(digest: bytes) -> tuple[int, int, int]:
+    # Keep placeholder colours mid-range so white captions stay readable
+    return tuple(60 + b % 120 for b in digest[:3])
+
+
+def render_to_file(prompt: str, image_path: str, width: int, height: int, output_format: str) -> StreamStats:
+    """
+    Draw a vertical gradient whose colours are derived from ``prompt`` and
+    save it to ``image_path``. Used when Stability is unavailable, so a scene
+    still gets a background.
+    """
+    from PIL import Image
+
+    started = time.monotonic()
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    top, bottom = _colour(digest), _colour(digest[3:])
+    gradient = Image.linear_gradient("L").resize((width, height))
+    image = Image.composite(Image.new("RGB", (width, height), bottom), Image.new("RGB", (width, height), top), gradient)
+    image.save(image_path, format=output_format.upper())
+    elapsed = time.monotonic() - started
+    return StreamStats(image_path, os.path.getsize(image_path), elapsed, elapsed)
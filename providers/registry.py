@@ -0,0 +1,190 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+
+from concurrency import NoCapacity, current_attempt
+
+UNHEALTHY_AFTER_FAILURES = 3
+BREAKER_COOLDOWN = float(os.getenv("PROVIDER_BREAKER_COOLDOWN", "30"))  # seconds before retrying an open circuit
+LATENCY_WINDOW = 100  # recent successful calls kept for percentiles
+MIN_LATENCY_SAMPLES = 5
+
+
+@dataclass
+class ProviderHealth:
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_error: str | None = None
+    last_latency_s: float | None = None
+    last_failure_at: float | None = None  # time.monotonic()
+    latencies: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW), repr=False)
+
+    @property
+    def healthy(self) -> bool:
+        return self.consecutive_failures < UNHEALTHY_AFTER_FAILURES
+
+    @property
+    def p95_latency(self) -> float | None:
+        """Nearest-rank p95 of recent successful calls, once there are enough of them."""
+        if len(self.latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[math.ceil(0.95 * len(ordered)) - 1]
+
+
+class Provider:
+    """
+    A long-lived backend client (and its connection pool), the process-wide
+    limit on concurrent requests to it, and its health counters.
+
+    The health counters double as a circuit breaker: after
+    ``UNHEALTHY_AFTER_FAILURES`` failures in a row the provider is skipped
+    for ``BREAKER_COOLDOWN`` seconds, then a single call is let through to
+    probe it again. Hedged attempts that lost the race are left out.
+    """
+
+    def __init__(self, name: str, factory, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.health = ProviderHealth()
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._busy = 0
+
+    @property
+    def client(self):
+        """The shared client, created on first use."""
+        with self._lock:
+            if self._client is None:
+                self._client = self._factory()
+            return self._client
+
+    def set_client(self, client):
+        """Replace the client, e.g. with a local stand-in for benchmarks."""
+        with self._lock:
+            self._client = client
+
+    def take_client(self):
+        """Detach the client for closing, or None if it was never created; the next use creates a new one."""
+        with self._lock:
+            client, self._client = self._client, None
+            return client
+
+    def has_free_slot(self) -> bool:
+        """Whether a request could be sent right now without queueing."""
+        with self._lock:
+            return self._busy < self.max_concurrency
+
+    def _record(self, started: float, error: BaseException | None):
+        attempt = current_attempt.get()
+        if attempt is not None and attempt.abandoned:
+            return
+        with self._lock:
+            if error is None:
+                self.health.successes += 1
+                self.health.consecutive_failures = 0
+                self.health.last_latency_s = time.monotonic() - started
+                self.health.latencies.append(self.health.last_latency_s)
+            else:
+                self.health.failures += 1
+                self.health.consecutive_failures += 1
+                self.health.last_error = f"{type(error).__name__}: {error}"
+                self.health.last_failure_at = time.monotonic()
+
+    def available(self) -> bool:
+        """False while the circuit is open; half-open (True) once the cooldown has passed."""
+        with self._lock:
+            if self.health.healthy or self.health.last_failure_at is None:
+                return True
+            if time.monotonic() - self.health.last_failure_at < BREAKER_COOLDOWN:
+                return False
+            # Half-open: let this call probe the provider; another failure reopens the circuit
+            self.health.last_failure_at = time.monotonic()
+            return True
+
+    def _mark_busy(self):
+        with self._lock:
+            self._busy += 1
+
+    def _release(self):
+        with self._lock:
+            self._busy -= 1
+        self._slots.release()
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold one of the provider's request slots (blocking); yields the client.
+
+        Inside a hedged call the attempt is marked sent once it has the slot;
+        a duplicate does not queue but raises :class:`NoCapacity`.
+        """
+        attempt = current_attempt.get()
+        if not self._slots.acquire(blocking=attempt is None or not attempt.duplicate):
+            raise NoCapacity(f"{self.name}: every request slot is taken")
+        self._mark_busy()
+        if attempt is not None:
+            attempt.mark_sent()
+        started = time.monotonic()
+        try:
+            yield self.client
+        except Exception as e:
+            self._record(started, e)
+            raise
+        else:
+            self._record(started, None)
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """Like :meth:`slot`, but waits without blocking the event loop."""
+        if not self._slots.acquire(blocking=False):
+            waiter = asyncio.ensure_future(asyncio.to_thread(self._slots.acquire))
+            try:
+                await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                # The thread still gets the slot eventually; hand it straight back
+                waiter.add_done_callback(lambda _: self._slots.release())
+                raise
+        self._mark_busy()
+        started = time.monotonic()
+        try:
+            yield self.client
+        except Exception as e:
+            self._record(started, e)
+            raise
+        else:
+            self._record(started, None)
+        finally:
+            self._release()
+
+
+class ProviderRegistry:
+    def __init__(self):
+        self._providers: dict[str, Provider] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory, max_concurrency: int) -> Provider:
+        with self._lock:
+            if name not in self._providers:
+                self._providers[name] = Provider(name, factory, max_concurrency)
+            return self._providers[name]
+
+    def get(self, name: str) -> Provider:
+        return self._providers[name]
+
+    def health(self) -> dict[str, ProviderHealth]:
+        with self._lock:
+            return {name: provider.health for name, provider in self._providers.items()}
+
+
+registry = ProviderRegistry()
@@ -0,0 +1,72 @@
+import os
+
+from concurrency import retry_call
+from providers.registry import registry
+from streaming import StreamStats, stream_to_file
+
+DEFAULT_API_URL = "https://api.stability.ai/v2beta/stable-image/generate/core"
+POOL_SIZE = int(os.getenv("IMAGE_MAX_CONCURRENCY", "4"))
+
+
+def _create_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+provider = registry.register("image", _create_session, POOL_SIZE)
+
+
+def get_session():
+    """Shared keep-alive session for Stability requests, created on first use."""
+    return provider.client
+
+
+def _download_image(prompt: str, image_path: str, width: int, height: int, seed: int,
+                    output_format: str) -> StreamStats:
+    headers = {
+        "Authorization": f"Bearer {os.getenv('STABILITY_API_KEY')}",
+        "Accept": "image/*"
+    }
+    payload = {
+        "prompt": (None, prompt),
+        "output_format": (None, output_format),
+        "height": (None, str(height)),
+        "width": (None, str(width)),
+        "seed": (None, str(seed))
+    }
+    timeout = (
+        float(os.getenv("IMAGE_CONNECT_TIMEOUT", "10")),
+        float(os.getenv("IMAGE_READ_TIMEOUT", "120")),
+    )
+    with provider.slot() as session, session.post(
+        os.getenv("STABILITY_API_URL", DEFAULT_API_URL),
+        headers=headers,
+        files=payload,
+        stream=True,
+        timeout=timeout,
+    ) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text}")
+
+        # Stream into a temp file next to the target, then rename atomically
+        return stream_to_file(response.iter_content(chunk_size=64 * 1024), image_path)
+
+
+def download_image(prompt: str, image_path: str, width: int, height: int, seed: int,
+                   output_format: str) -> StreamStats:
+    """
+    POST one prompt to Stability and stream the image body to ``image_path``.
+    Connection errors and timeouts are retried with backoff.
+    """
+    import requests
+
+    return retry_call(
+        _download_image, prompt, image_path, width, height, seed, output_format,
+        retry_on=(requests.ConnectionError, requests.Timeout),
+    )
@@ -0,0 +1,444 @@
+import contextvars
+import multiprocessing
+import os
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+import numpy as np
+from moviepy.editor import (
+    ImageClip, AudioFileClip,
+    CompositeAudioClip, VideoClip
+)
+from moviepy.config import get_setting
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from PIL import Image
+
+from audio_mix import MIX_BLOCK, SAMPLE_RATE, iter_audio, lay_out, load_music, mix_music, mux_audio
+from asset_cache import segment_cache, segment_cache_key
+from caption_raster import render_caption
+from manifest import AudioAsset, ImageAsset, JobManifest
+from timeline import SCENE_CROSSFADE, ScenePlan, plan_timeline, total_duration
+from tracing import span
+
+WIDTH, HEIGHT = 1080, 1920
+FONT = "./arialbd.ttf"  # Make sure this path is correct
+CAPTION_FONTSIZE = 64
+CAPTION_MARGIN = 100  # total horizontal padding around the caption
+BACKGROUND_MUSIC = "music/grey-sky-810121-PREVIEW.mp3"
+BACKGROUND_MUSIC_VOLUME = 0.1
+FPS = 24
+VIDEO_CODEC = "libx264"
+AUDIO_CODEC = "aac"
+SCENES_DIR = "scenes"
+CAPTION_Y = HEIGHT - 200
+
+# "still" composes each scene into one finished frame and encodes it as a
+# still segment; "kenburns" opts into a slow zoom, drawn frame by frame
+SCENE_MOTION = os.getenv("SCENE_MOTION", "still")
+KEN_BURNS_ZOOM = float(os.getenv("KEN_BURNS_ZOOM", "1.1"))  # scale reached at the end of a scene
+
+# "serial" renders scenes one after another in this process, "process"
+# renders them in a pool of worker processes (one per core by default),
+# "stream" pipes every scene through a single encoder for long videos
+RENDER_MODE = os.getenv("RENDER_MODE", "process")
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1)))
+
+# Bump when the way a scene is drawn changes, so cached segments are not reused
+SEGMENT_FORMAT_VERSION = 4
+
+
+@dataclass(frozen=True)
+class EncoderSettings:
+    """Settings handed to ffmpeg when encoding a scene."""
+    codec: str = VIDEO_CODEC
+    preset: str = os.getenv("RENDER_PRESET", "medium")
+    threads: int | None = None
+    audio_codec: str = AUDIO_CODEC
+
+
+DEFAULT_ENCODER = EncoderSettings()
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Shared process pool for scene encoding, created on first use."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _render_pool
+
+
+def pooled_encoder(encoder: EncoderSettings = DEFAULT_ENCODER) -> EncoderSettings:
+    """
+    Encoder settings for use inside the render pool: unless set explicitly,
+    the cores are split between workers instead of every ffmpeg grabbing all.
+    """
+    if encoder.threads is not None:
+        return encoder
+    return replace(encoder, threads=max(1, (os.cpu_count() or 1) // RENDER_WORKERS))
+
+
+def _run_ffmpeg(args: list[str]):
+    cmd = [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error", *args]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({result.returncode}): {result.stderr.strip()}")
+
+
+def _concat_entry(path: str) -> str:
+    escaped = os.path.abspath(path).replace("'", "'\\''")
+    return f"file '{escaped}'\n"
+
+
+def _mix_soundtrack(video_path: str, output_path: str, audio_codec: str, voice=None):
+    """
+    Lay the cached background music under the voice track and mux the
+    result, streaming the audio through in blocks.
+
+    Args:
+        voice: Blocks of the voice track; by default it is decoded from
+            ``video_path``, which is then moved into place as is when there
+            is no music to add
+    """
+    with span("audio.mix", category="render") as attrs:
+        if not os.path.exists(BACKGROUND_MUSIC):
+            print("⚠️ No background music found. Skipping...")
+            if voice is None:
+                os.replace(video_path, output_path)
+                return
+            samples = voice
+        else:
+            if voice is None:
+                voice = iter_audio(video_path, MIX_BLOCK)
+            samples = mix_music(voice, load_music(BACKGROUND_MUSIC), BACKGROUND_MUSIC_VOLUME)
+
+        def counted(blocks):
+            length = 0
+            for block in blocks:
+                length += len(block)
+                yield block
+            attrs["seconds"] = round(length / SAMPLE_RATE, 2)
+
+        mux_audio(video_path, counted(samples), output_path, audio_codec)
+
+
+def plan_scenes(voices: list[AudioAsset], crossfade: float = 0.0) -> list[ScenePlan]:
+    """Time every scene from the voiceover durations recorded in the manifest."""
+    return plan_timeline([voice.duration for voice in voices], fps=FPS, crossfade=crossfade)
+
+
+def _fit_background(img_path: str) -> Image.Image:
+    """Scale the image to the frame height and centre it on a black canvas, cropping or letterboxing the sides."""
+    with Image.open(img_path) as img:
+        img = img.convert("RGB")
+        scaled_width = round(img.width * HEIGHT / img.height)
+        img = img.resize((scaled_width, HEIGHT), Image.LANCZOS)
+    canvas = Image.new("RGB", (WIDTH, HEIGHT))
+    canvas.paste(img, ((WIDTH - scaled_width) // 2, 0))
+    return canvas
+
+
+def _caption_image(cap: str) -> Image.Image:
+    # Rasterized with Pillow (cached per caption) instead of shelling out to ImageMagick
+    return Image.fromarray(render_caption(cap, FONT, CAPTION_FONTSIZE, WIDTH - CAPTION_MARGIN), "RGBA")
+
+
+def _overlay_caption(frame: Image.Image, caption: Image.Image) -> np.ndarray:
+    frame.paste(caption, ((WIDTH - caption.width) // 2, CAPTION_Y), caption)
+    return np.asarray(frame)
+
+
+def compose_still_frame(img_path: str, cap: str) -> np.ndarray:
+    """
+    Decode, scale and letterbox the image and draw the caption on it, once.
+
+    Returns:
+        The finished RGB frame, shape (HEIGHT, WIDTH, 3)
+    """
+    return _overlay_caption(_fit_background(img_path), _caption_image(cap))
+
+
+def _ken_burns_clip(img_path: str, cap: str, duration: float) -> VideoClip:
+    """Slow centred zoom from 1x to ``KEN_BURNS_ZOOM`` over the scene, caption fixed on top."""
+    background = _fit_background(img_path)
+    caption = _caption_image(cap)
+
+    def make_frame(t):
+        zoom = 1 + (KEN_BURNS_ZOOM - 1) * (t / duration if duration else 0)
+        box_width, box_height = WIDTH / zoom, HEIGHT / zoom
+        left, top = (WIDTH - box_width) / 2, (HEIGHT - box_height) / 2
+        frame = background.resize((WIDTH, HEIGHT), Image.BILINEAR,
+                                  box=(left, top, left + box_width, top + box_height))
+        return _overlay_caption(frame, caption)
+
+    return VideoClip(make_frame, duration=duration)
+
+
+def _build_scene_video(img_path, cap, duration, motion=SCENE_MOTION):
+    if motion == "still":
+        # The picture never changes, so every frame is the same precomposed array
+        return ImageClip(compose_still_frame(img_path, cap)).set_duration(duration)
+    if motion == "kenburns":
+        return _ken_burns_clip(img_path, cap, duration)
+    raise ValueError(f"Unknown scene motion: {motion!r}")
+
+
+def _build_scene_clip(img_path, voice_path, cap, plan: ScenePlan, motion=SCENE_MOTION):
+    voice = AudioFileClip(voice_path).set_start(plan.lead_in)
+    audio = CompositeAudioClip([voice]).set_duration(plan.duration)
+
+    comp = _build_scene_video(img_path, cap, plan.duration, motion)
+    return comp.set_audio(audio)
+
+
+def scene_cache_key(image: ImageAsset, voice: AudioAsset, caption: str, plan: ScenePlan,
+                    encoder: EncoderSettings = DEFAULT_ENCODER, motion: str = SCENE_MOTION) -> str:
+    """Hash of everything that affects how a scene segment looks and sounds."""
+    return segment_cache_key(
+        SEGMENT_FORMAT_VERSION,
+        image.sha256,
+        voice.sha256,
+        caption,
+        WIDTH, HEIGHT, FPS, FONT, CAPTION_FONTSIZE, plan.duration, plan.lead_in,
+        encoder.codec, encoder.preset, encoder.audio_codec,
+        motion, KEN_BURNS_ZOOM if motion == "kenburns" else None,
+    )
+
+
+def _encode_still_scene(img_path: str, voice_path: str, caption: str, output_path: str,
+                        plan: ScenePlan, encoder: EncoderSettings):
+    """Encode the precomposed frame as a still segment; ffmpeg repeats it, nothing is redrawn."""
+    delay_ms = round(plan.lead_in * 1000)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_path))) as tmp_dir:
+        frame_path = os.path.join(tmp_dir, "frame.png")
+        Image.fromarray(compose_still_frame(img_path, caption)).save(frame_path)
+        tune = ["-tune", "stillimage"] if encoder.codec == "libx264" else []
+        threads = ["-threads", str(encoder.threads)] if encoder.threads else []
+        _run_ffmpeg([
+            "-loop", "1", "-framerate", str(FPS), "-i", frame_path, "-i", voice_path,
+            "-t", f"{plan.duration:.3f}", "-map", "0:v", "-map", "1:a",
+            # Offset the voice by the lead-in and pad it with silence to the scene length
+            "-af", f"adelay={delay_ms}:all=1,apad",
+            "-c:v", encoder.codec, "-preset", encoder.preset, *tune, *threads, "-pix_fmt", "yuv420p",
+            "-c:a", encoder.audio_codec, output_path,
+        ])
+
+
+def _encode_scene(img_path: str, voice_path: str, caption: str, output_path: str,
+                  plan: ScenePlan, encoder: EncoderSettings, motion: str = SCENE_MOTION):
+    """
+    Build and encode one scene; module-level so worker processes can run it.
+
+    The segment is encoded next to ``output_path`` and renamed onto it:
+    ``output_path`` may be a hard link into the segment cache from an
+    earlier run, and writing through it would overwrite the cached object.
+    """
+    print(f"🖼️ Rendering scene: {img_path} | 🎙️ {voice_path} | 📝 '{caption}'")
+    root, ext = os.path.splitext(output_path)
+    partial_path = f"{root}.partial{ext}"
+    try:
+        if motion == "still":
+            _encode_still_scene(img_path, voice_path, caption, partial_path, plan, encoder)
+        else:
+            comp = _build_scene_clip(img_path, voice_path, caption, plan, motion)
+            comp.write_videofile(
+                partial_path,
+                fps=FPS,
+                codec=encoder.codec,
+                preset=encoder.preset,
+                threads=encoder.threads,
+                audio_codec=encoder.audio_codec,
+                logger=None,
+            )
+            comp.close()
+        os.replace(partial_path, output_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+
+def render_scene(image: ImageAsset, voice: AudioAsset, caption: str, output_path: str,
+                 encoder: EncoderSettings = DEFAULT_ENCODER,
+                 executor: ProcessPoolExecutor | None = None,
+                 motion: str = SCENE_MOTION,
+                 plan: ScenePlan | None = None) -> str:
+    """
+    Render a single scene (image + caption + voice) to its own encoded segment.
+
+    The scene lasts as long as ``plan`` says; without a plan it is timed
+    from its own voiceover, so the speech is never cut. Durations and
+    hashes come from the manifest assets; the files are only read to encode.
+
+    With ``motion="still"`` the frame is composed once and encoded as a
+    still; ``motion="kenburns"`` draws a slow zoom frame by frame.
+
+    Segments are cached under a hash of their inputs, so an unchanged scene
+    is never re-encoded. Cache bookkeeping always happens in the calling
+    process; only the encode is sent to ``executor`` when one is given.
+
+    Returns:
+        Path of the rendered scene
+    """
+    with span("render.scene", category="render", output=output_path) as attrs:
+        plan = plan or plan_scenes([voice])[0]
+        attrs["duration_s"] = plan.duration
+        cache_key = scene_cache_key(image, voice, caption, plan, encoder, motion)
+        if segment_cache.fetch(cache_key, output_path):
+            attrs["cache"] = "hit"
+            print(f"♻️ Reusing cached scene: '{caption}'")
+            return output_path
+        attrs["cache"] = "miss"
+
+        if executor is None:
+            _encode_scene(image.path, voice.path, caption, output_path, plan, encoder, motion)
+        else:
+            executor.submit(_encode_scene, image.path, voice.path, caption, output_path,
+                            plan, encoder, motion).result()
+        segment_cache.store(cache_key, output_path)
+        attrs["bytes"] = os.path.getsize(output_path)
+        return output_path
+
+
+def stitch_scenes(scene_paths: list[str], output_path: str = "final_output.mp4") -> str:
+    """
+    Join rendered scenes into the final video.
+
+    Video is stream-copied with the ffmpeg concat demuxer; the only encode
+    is a single audio pass with the background music mixed in by numpy,
+    block by block.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    with span("render.final", category="render", scenes=len(scene_paths)) as attrs, \
+            tempfile.TemporaryDirectory(dir=output_dir) as tmp_dir:
+        list_path = os.path.join(tmp_dir, "scenes.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in scene_paths:
+                f.write(_concat_entry(path))
+
+        joined_path = os.path.join(tmp_dir, "joined.mp4")
+        _run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", joined_path])
+
+        _mix_soundtrack(joined_path, output_path, AUDIO_CODEC)
+        attrs["bytes"] = os.path.getsize(output_path)
+
+    print(f"✅ Done: {output_path}")
+    return output_path
+
+
+def compose_streaming(manifest: JobManifest,
+                      output_path: str = "final_output.mp4",
+                      encoder: EncoderSettings = DEFAULT_ENCODER,
+                      crossfade: float = SCENE_CROSSFADE) -> str:
+    """
+    Render the whole video through a single encoder pipe, one scene at a time.
+
+    Frames are written as they are produced and a scene's clips are released
+    once it has ended, so at most two scenes (during a crossfade) are open.
+    The soundtrack is built the same way: voiceovers are decoded as the
+    track reaches their planned offsets and mixed with the background music
+    in blocks piped to the muxer, so peak memory does not grow with the
+    length of the video.
+    """
+    images, voices, captions = zip(*manifest.scenes())
+    plans = plan_scenes(voices, crossfade)
+    total_frames = round(total_duration(plans) * FPS)
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    with span("render.stream", category="render", scenes=len(images), frames=total_frames) as attrs, \
+            tempfile.TemporaryDirectory(dir=output_dir) as tmp_dir:
+        video_path = os.path.join(tmp_dir, "video.mp4")
+        open_scenes = {}
+
+        def scene_clip(i: int):
+            if i not in open_scenes:
+                print(f"🖼️ Streaming scene {i + 1}: {images[i].path} | 🎙️ {voices[i].path} | 📝 '{captions[i]}'")
+                open_scenes[i] = _build_scene_video(images[i].path, captions[i], plans[i].duration)
+            return open_scenes[i]
+
+        writer = FFMPEG_VideoWriter(
+            video_path, (WIDTH, HEIGHT), FPS,
+            codec=encoder.codec, preset=encoder.preset, threads=encoder.threads,
+        )
+        try:
+            current = 0
+            for n in range(total_frames):
+                t = n / FPS
+                while current + 1 < len(plans) and t >= plans[current].end:
+                    open_scenes.pop(current).close()
+                    current += 1
+                plan = plans[current]
+                frame = scene_clip(current).get_frame(t - plan.start)
+                following = plans[current + 1] if current + 1 < len(plans) else None
+                if following is not None and t >= following.start:
+                    # Dissolve into the next scene over the overlap
+                    alpha = (t - following.start) / (plan.end - following.start)
+                    incoming = scene_clip(current + 1).get_frame(t - following.start)
+                    frame = (frame * (1 - alpha) + incoming * alpha).astype(np.uint8)
+                writer.write_frame(frame)
+        finally:
+            writer.close()
+            for clip in open_scenes.values():
+                clip.close()
+
+        voice = lay_out(
+            [(plan.speech_start, voice.path) for plan, voice in zip(plans, voices)],
+            total_duration(plans), MIX_BLOCK,
+        )
+        _mix_soundtrack(video_path, output_path, encoder.audio_codec, voice)
+        attrs["bytes"] = os.path.getsize(output_path)
+
+    print(f"✅ Done: {output_path}")
+    return output_path
+
+
+def render_video(manifest: JobManifest,
+                 output_path: str = "final_output.mp4",
+                 encoder: EncoderSettings = DEFAULT_ENCODER,
+                 mode: str = RENDER_MODE,
+                 scenes_dir: str = SCENES_DIR) -> str:
+    """
+    Render every scene of the job's manifest (reusing cached segments) and
+    stitch them together. Scenes are timed from their voiceovers; crossfades
+    need the "stream" mode, since segments are joined without re-encoding.
+
+    Args:
+        mode: "serial" to encode in this process, "process" to encode scenes
+            in parallel in the shared render pool, "stream" to compose the
+            whole video through one encoder with memory independent of length
+        scenes_dir: Directory the per-scene segments are written to
+    """
+    if mode == "stream":
+        return compose_streaming(manifest, output_path, encoder)
+
+    os.makedirs(scenes_dir, exist_ok=True)
+    scenes = manifest.scenes()
+    plans = plan_scenes([voice for _, voice, _ in scenes])
+    jobs = [
+        (image, voice, cap, os.path.join(scenes_dir, f"scene_{i}.mp4"))
+        for i, (image, voice, cap) in enumerate(scenes, 1)
+    ]
+
+    if mode == "serial":
+        scene_paths = [render_scene(*job, encoder=encoder, plan=plan) for job, plan in zip(jobs, plans)]
+    elif mode == "process":
+        pool = get_render_pool()
+        encoder = pooled_encoder(encoder)
+        with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as dispatch:
+            futures = [
+                dispatch.submit(contextvars.copy_context().run, render_scene, *job,
+                                encoder=encoder, executor=pool, plan=plan)
+                for job, plan in zip(jobs, plans)
+            ]
+            scene_paths = [future.result() for future in futures]
+    else:
+        raise ValueError(f"Unknown render mode: {mode!r}")
+
+    return stitch_scenes(scene_paths, output_path)
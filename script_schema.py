@@ -0,0 +1,174 @@
+import json
+import os
+import re
+from dataclasses import asdict, dataclass
+
+CAPTION_COUNT = 5
+CAPTION_MAX_WORDS = 8
+SCRIPT_MAX_REPAIRS = int(os.getenv("SCRIPT_MAX_REPAIRS", "2"))
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.DOTALL)
+_CAPTIONS_KEY = re.compile(r'"captions"\s*:\s*\[')
+
+
+class ScriptValidationError(ValueError):
+    """The script writer's reply is not a valid script; ``errors`` lists every problem found."""
+
+    def __init__(self, errors: list[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+@dataclass(frozen=True)
+class Script:
+    topic: str
+    takeaway: str
+    captions: list[str]
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+
+def _json_object(text: str):
+    """
+    Decode the first complete JSON object in a reply, ignoring code fences
+    and any prose before or after it (which may contain braces of its own).
+
+    Raises:
+        ValueError: if no JSON object can be decoded
+    """
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    decoder = json.JSONDecoder()
+    first_error = None
+    start = text.find("{")
+    while start != -1:
+        try:
+            return decoder.raw_decode(text, start)[0]
+        except ValueError as e:
+            first_error = first_error or e
+        start = text.find("{", start + 1)
+    if first_error is not None:
+        raise first_error
+    return json.loads(text.strip())
+
+
+def parse_script(text: str, caption_count: int = CAPTION_COUNT,
+                 max_words: int = CAPTION_MAX_WORDS) -> Script:
+    """
+    Parse and validate the script writer's JSON reply.
+
+    Raises:
+        ScriptValidationError: listing everything that is wrong with the reply
+    """
+    if not isinstance(text, str):
+        raise ScriptValidationError([f"expected a text reply, got {type(text).__name__}"])
+    try:
+        data = _json_object(text)
+    except ValueError as e:
+        raise ScriptValidationError([f"reply is not valid JSON ({e})"]) from None
+    if not isinstance(data, dict):
+        raise ScriptValidationError(["reply must be a JSON object"])
+
+    errors = []
+    for field in ("topic", "takeaway"):
+        if not isinstance(data.get(field), str) or not data[field].strip():
+            errors.append(f'"{field}" must be a non-empty string')
+
+    captions = data.get("captions")
+    if not isinstance(captions, list):
+        errors.append('"captions" must be a list of strings')
+        captions = []
+    elif len(captions) != caption_count:
+        errors.append(f'"captions" must have exactly {caption_count} entries, got {len(captions)}')
+    for i, caption in enumerate(captions, 1):
+        if not isinstance(caption, str) or not caption.strip():
+            errors.append(f"caption {i} must be a non-empty string")
+        elif len(caption.split()) > max_words:
+            errors.append(f"caption {i} has {len(caption.split())} words, the limit is {max_words}")
+
+    if errors:
+        raise ScriptValidationError(errors)
+    return Script(
+        topic=data["topic"].strip(),
+        takeaway=data["takeaway"].strip(),
+        captions=[caption.strip() for caption in captions],
+    )
+
+
+def repair_prompt(error: ScriptValidationError) -> str:
+    problems = "\n".join(f"- {problem}" for problem in error.errors)
+    return (
+        "Your previous reply could not be used:\n"
+        f"{problems}\n"
+        "Reply again with only the corrected JSON object, no other text."
+    )
+
+
+def _string_end(text: str, start: int) -> int | None:
+    """Index just past the JSON string literal opening at ``start``, or None if it is still open."""
+    i = start + 1
+    while i < len(text):
+        if text[i] == "\\":
+            i += 2
+        elif text[i] == '"':
+            return i + 1
+        else:
+            i += 1
+    return None
+
+
+class CaptionStreamParser:
+    """
+    Pulls captions out of a script reply while it is still being streamed.
+
+    ``feed`` returns each caption as soon as its string closes in the
+    ``captions`` array. This is only a hint for starting work early: the
+    complete reply must still go through parse_script.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = None  # where scanning resumes inside the captions array
+        self._count = 0
+        self._done = False
+
+    def feed(self, chunk: str) -> list[tuple[int, str]]:
+        """
+        Returns:
+            ``(index, caption)`` for every caption completed by ``chunk``; indices start at 1
+        """
+        self._buffer += chunk
+        if self._done:
+            return []
+        if self._pos is None:
+            match = _CAPTIONS_KEY.search(self._buffer)
+            if match is None:
+                return []
+            self._pos = match.end()
+
+        found = []
+        buffer = self._buffer
+        while not self._done:
+            i = self._pos
+            while i < len(buffer) and buffer[i] in " \t\r\n,":
+                i += 1
+            self._pos = i
+            if i >= len(buffer):
+                break
+            if buffer[i] != '"':
+                self._done = True  # end of the array, or not a list of strings
+                break
+            end = _string_end(buffer, i)
+            if end is None:
+                break
+            try:
+                caption = json.loads(buffer[i:end]).strip()
+            except ValueError:
+                self._done = True
+                break
+            self._count += 1
+            found.append((self._count, caption))
+            self._pos = end
+        return found
@@ -24,13 +24,10 @@ from autogen_core.models import (
     FunctionExecutionResultMessage,
 )
 from autogen_core.tools import FunctionTool, Tool
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from elevenlabs.client import ElevenLabs
+from providers import elevenlabs_tts, llm
 
 # Load environment variables
 load_dotenv()
-elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
-elevenlabs_client = ElevenLabs(api_key=elevenlabs_api_key)
 
 voice_id = "onwK4e9ZLuTAKqWW03F9"
 
@@ -50,18 +47,10 @@ def generate_voiceovers_tool(input: dict) -> dict:
             audio_paths.append(save_file_path)
             continue
 
-        response = elevenlabs_client.text_to_speech.convert(
-            text=message,
-            voice_id=voice_id,
-            model_id="eleven_multilingual_v2",
-            output_format="mp3_22050_32",
+        elevenlabs_tts.synthesize_to_file(
+            message, voice_id, "eleven_multilingual_v2", "mp3_22050_32", save_file_path
         )
 
-        with open(save_file_path, "wb") as f:
-            for chunk in response:
-                if chunk:
-                    f.write(chunk)
-
         audio_paths.append(save_file_path)
 
     return {"voiceover_paths": audio_paths}
@@ -124,7 +113,7 @@ class ToolUseAgent(RoutedAgent):
 
 
 async def main():
-    model_client = OpenAIChatCompletionClient(model="gemini-1.5-flash-8b")
+    model_client = llm.get_model_client()
     runtime = SingleThreadedAgentRuntime()
     
     voiceover_tool = FunctionTool(generate_voiceovers_tool, description="Generate and save voiceovers for a list of captions")
@@ -143,7 +132,7 @@ async def main():
     print("\nAgent Response:", response.content)
 
     await runtime.stop()
-    await model_client.close()
+    await llm.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from aiohttp import web
+from autogen_agentchat.base import TaskResult
+
+from elevenlab_test import create_team, working_directory
+from providers import llm
+from script_schema import ScriptValidationError, parse_script
+from tracing import Tracer, tracing
+
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8080"))
+SERVER_JOBS_DIR = os.getenv("SERVER_JOBS_DIR", "jobs")
+SERVER_MAX_JOBS = int(os.getenv("SERVER_MAX_JOBS", "4"))
+SSE_KEEPALIVE = 15  # seconds between comments on an idle event stream
+
+# Graph node -> progress stage reported when its message arrives
+NODE_STAGES = {
+    "script_writer": "script",
+    "voice_actor": "voiceovers",
+    "graphic_designer": "images",
+    "director": "video",
+}
+FINAL_STAGES = ("done", "error")
+
+
+@dataclass
+class Job:
+    id: str
+    topic: str
+    workdir: str
+    status: str = "queued"
+    captions: list[str] | None = None
+    video_path: str | None = None
+    error: str | None = None
+    events: list[dict] = field(default_factory=list)
+    subscribers: set[asyncio.Queue] = field(default_factory=set)
+    scenes_rendered: int = 0
+
+    def publish(self, stage: str, **data):
+        event = {"seq": len(self.events), "time": round(time.time(), 3), "stage": stage, **data}
+        self.events.append(event)
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+
+    def describe(self) -> dict:
+        return {
+            "id": self.id,
+            "topic": self.topic,
+            "status": self.status,
+            "captions": self.captions,
+            "error": self.error,
+            "events": f"/jobs/{self.id}/events",
+            "video": f"/jobs/{self.id}/video" if self.video_path else None,
+        }
+
+
+class JobManager:
+    """
+    Runs submitted topics through the agent graph, at most ``max_jobs`` at a
+    time, turning agent messages and tracing spans into progress events.
+    """
+
+    def __init__(self, model_client, jobs_dir: str = SERVER_JOBS_DIR, max_jobs: int = SERVER_MAX_JOBS):
+        self.model_client = model_client
+        self.jobs_dir = jobs_dir
+        self.jobs: dict[str, Job] = {}
+        self._semaphore = asyncio.Semaphore(max_jobs)
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(self, topic: str) -> Job:
+        job_id = uuid.uuid4().hex[:12]
+        job = Job(id=job_id, topic=topic, workdir=os.path.join(self.jobs_dir, job_id))
+        self.jobs[job_id] = job
+        job.publish("queued")
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def _on_message(self, job: Job, message):
+        stage = NODE_STAGES.get(getattr(message, "source", None))
+        if stage is None:
+            return
+        if stage == "script":
+            try:
+                job.captions = parse_script(message.content).captions
+            except ScriptValidationError:
+                return
+            job.publish("script", captions=job.captions)
+            return
+        try:
+            payload = json.loads(message.content)
+        except (TypeError, ValueError):
+            payload = {}
+        job.publish(stage, **payload)
+
+    def _on_span(self, job: Job, event: dict):
+        args = event["args"]
+        if args.get("speculative"):
+            return  # may be discarded; the real tts and image spans report progress
+        status = {"error": args["error"]} if "error" in args else {}
+        if event["name"] == "tts":
+            job.publish("voiceover", index=args.get("scene"), cache=args.get("cache"), backend=args.get("backend"), **status)
+        elif event["name"] == "image":
+            job.publish("image", index=args.get("scene"), cache=args.get("cache"), backend=args.get("backend"), **status)
+        elif event["name"] == "render.scene":
+            job.scenes_rendered += 1
+            total = len(job.captions or ()) or job.scenes_rendered
+            job.publish("render", percent=min(99, round(100 * job.scenes_rendered / total)), **status)
+        elif event["name"] in ("render.final", "render.stream"):
+            job.publish("render", percent=100, **status)
+
+    async def _run(self, job: Job):
+        loop = asyncio.get_running_loop()
+
+        def listener(event):
+            # Spans close on tool and render threads; hand them to the event loop
+            loop.call_soon_threadsafe(self._on_span, job, event)
+
+        async with self._semaphore:
+            job.status = "running"
+            job.publish("running")
+            tracer = Tracer(job.id, listener=listener)
+            try:
+                with tracing(tracer), working_directory(job.workdir):
+                    team = create_team(self.model_client)
+                    async for item in team.run_stream(task=job.topic):
+                        if not isinstance(item, TaskResult):
+                            self._on_message(job, item)
+                video_path = os.path.join(job.workdir, "final_output.mp4")
+                if not os.path.exists(video_path):
+                    raise RuntimeError("The run finished without producing a video")
+                job.video_path = video_path
+                job.status = "done"
+                job.publish("done", video=f"/jobs/{job.id}/video")
+            except Exception as e:
+                job.status = "error"
+                job.error = f"{type(e).__name__}: {e}"
+                job.publish("error", error=job.error)
+            finally:
+                tracer.export(os.path.join(job.workdir, "trace.json"))
+
+
+# === HANDLERS ===
+routes = web.RouteTableDef()
+
+
+def _get_job(request: web.Request) -> Job:
+    job = request.app["manager"].jobs.get(request.match_info["job_id"])
+    if job is None:
+        raise web.HTTPNotFound(text=json.dumps({"error": "unknown job"}), content_type="application/json")
+    return job
+
+
+@routes.post("/jobs")
+async def create_job(request: web.Request) -> web.Response:
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    topic = body.get("topic") if isinstance(body, dict) else None
+    if not isinstance(topic, str) or not topic.strip():
+        return web.json_response({"error": 'expected a JSON body like {"topic": "..."}'}, status=400)
+    job = request.app["manager"].submit(topic.strip())
+    return web.json_response(job.describe(), status=202)
+
+
+@routes.get("/jobs/{job_id}")
+async def get_job(request: web.Request) -> web.Response:
+    return web.json_response(_get_job(request).describe())
+
+
+@routes.get("/jobs/{job_id}/events")
+async def job_events(request: web.Request) -> web.StreamResponse:
+    """
+    Server-sent events: everything published so far, then live progress
+    until the job is done or fails. Honours Last-Event-ID on reconnect.
+    """
+    job = _get_job(request)
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+
+    queue = asyncio.Queue()
+    job.subscribers.add(queue)
+    try:
+        last_seq = int(request.headers.get("Last-Event-ID", "-1"))
+    except ValueError:
+        last_seq = -1
+    try:
+        for event in list(job.events):
+            queue.put_nowait(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE)
+            except asyncio.TimeoutError:
+                await response.write(b": keep-alive\n\n")
+                continue
+            if event["seq"] <= last_seq:
+                continue  # already sent (replayed and queued live at the same time)
+            last_seq = event["seq"]
+            data = json.dumps(event, ensure_ascii=False)
+            await response.write(f"id: {event['seq']}\nevent: {event['stage']}\ndata: {data}\n\n".encode("utf-8"))
+            if event["stage"] in FINAL_STAGES:
+                break
+    except ConnectionResetError:
+        pass  # client went away
+    finally:
+        job.subscribers.discard(queue)
+    return response
+
+
+@routes.get("/jobs/{job_id}/video")
+async def job_video(request: web.Request) -> web.StreamResponse:
+    job = _get_job(request)
+    if job.video_path is None:
+        return web.json_response({"error": f"video not ready (job is {job.status})"}, status=409)
+    # FileResponse serves Range requests, so players can seek and downloads can resume
+    return web.FileResponse(job.video_path, headers={"Content-Type": "video/mp4"})
+
+
+async def _close_model_client(app: web.Application):
+    await llm.close()
+
+
+def create_app(model_client=None) -> web.Application:
+    app = web.Application()
+    app["manager"] = JobManager(model_client or llm.get_model_client())
+    app.add_routes(routes)
+    app.on_cleanup.append(_close_model_client)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host=SERVER_HOST, port=SERVER_PORT)
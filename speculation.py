@@ -0,0 +1,89 @@
+import asyncio
+import os
+
+from script_schema import CAPTION_COUNT
+from tools import (
+    IMAGE_MAX_CONCURRENCY,
+    TTS_MAX_CONCURRENCY,
+    caption_to_prompt,
+    generate_image,
+    generate_voiceover,
+)
+from tracing import span, span_tags
+
+SPECULATIVE_ASSETS = os.getenv("SPECULATIVE_ASSETS", "1") == "1"
+SPECULATIVE_DIR = ".speculative"
+
+
+class Speculator:
+    """
+    Starts voiceover and image requests for captions while the script is
+    still being written.
+
+    Speculative assets are written to a scratch directory, so their only
+    effect is to fill the asset cache; the real tools then find them there.
+    When the validated script is known, ``settle`` waits for the requests
+    whose caption survived and cancels the rest.
+    """
+
+    def __init__(self):
+        self._tasks: dict[int, tuple[str, list[asyncio.Task]]] = {}
+        self._workdir = "."
+        self._tts = asyncio.Semaphore(TTS_MAX_CONCURRENCY)
+        self._images = asyncio.Semaphore(IMAGE_MAX_CONCURRENCY)
+
+    def begin(self, workdir: str):
+        """Forget the previous run's requests and write new ones under ``workdir``."""
+        self.cancel_all()
+        self._workdir = os.path.join(workdir, SPECULATIVE_DIR)
+
+    async def _image(self, index: int, caption: str):
+        async with self._images:
+            images_dir = os.path.join(self._workdir, "images")
+            os.makedirs(images_dir, exist_ok=True)
+            return await asyncio.to_thread(generate_image, index, CAPTION_COUNT, caption_to_prompt(caption), images_dir)
+
+    def dispatch(self, index: int, caption: str):
+        """Start both requests for caption ``index`` (1-based), replacing any for an earlier draft of it."""
+        previous = self._tasks.get(index)
+        if previous is not None:
+            if previous[0] == caption:
+                return
+            for task in previous[1]:
+                task.cancel()
+        voices_dir = os.path.join(self._workdir, "voiceovers")
+        os.makedirs(voices_dir, exist_ok=True)
+        print(f"🔮 Speculating on caption {index}: '{caption}'")
+        # Tasks copy the context they are created in, so their tts and image
+        # spans carry the tag and progress reporting can tell them apart
+        with span_tags(speculative=True):
+            self._tasks[index] = (caption, [
+                asyncio.create_task(generate_voiceover(index, CAPTION_COUNT, caption, self._tts, voices_dir)),
+                asyncio.create_task(self._image(index, caption)),
+            ])
+
+    async def settle(self, captions: list[str]) -> int:
+        """
+        Wait for the speculative requests that match the final ``captions``
+        and cancel the others. Safe to call from several nodes.
+
+        Returns:
+            Number of captions whose assets were requested speculatively
+        """
+        with span("speculation.settle", category="pipeline") as attrs:
+            keep, cancelled = [], 0
+            for index, (caption, tasks) in self._tasks.items():
+                if index <= len(captions) and captions[index - 1] == caption:
+                    keep.extend(tasks)
+                else:
+                    cancelled += sum(task.cancel() for task in tasks)
+            await asyncio.gather(*keep, return_exceptions=True)
+            attrs["hits"] = len(keep) // 2
+            attrs["cancelled"] = cancelled
+            return attrs["hits"]
+
+    def cancel_all(self):
+        for _, tasks in self._tasks.values():
+            for task in tasks:
+                task.cancel()
+        self._tasks.clear()
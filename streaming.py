@@ -0,0 +1,66 @@
+import os
+import time
+from dataclasses import dataclass
+from typing import Iterable
+
+
+@dataclass
+class StreamStats:
+    path: str
+    bytes_written: int
+    first_byte_latency: float | None  # seconds until the first non-empty chunk
+    total_time: float
+
+
+class StreamingFileWriter:
+    """
+    Write a chunked response straight to disk.
+
+    Chunks go to ``<path>.part`` as they arrive; ``commit`` atomically
+    renames the file into place, so a reader never sees a partial asset.
+    Nothing reads a ``.part`` file while it is written: the renderer only
+    starts on a scene once its voiceover is complete and in the manifest.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.partial_path = f"{path}.part"
+        self.bytes_written = 0
+        self.first_byte_latency = None
+        self._started = time.monotonic()
+        self._file = open(self.partial_path, "wb")
+
+    def write(self, chunk: bytes):
+        if not chunk:
+            return
+        if self.first_byte_latency is None:
+            self.first_byte_latency = time.monotonic() - self._started
+        self._file.write(chunk)
+        self.bytes_written += len(chunk)
+
+    def commit(self) -> StreamStats:
+        self._file.close()
+        os.replace(self.partial_path, self.path)
+        return StreamStats(
+            path=self.path,
+            bytes_written=self.bytes_written,
+            first_byte_latency=self.first_byte_latency,
+            total_time=time.monotonic() - self._started,
+        )
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+
+
+def stream_to_file(chunks: Iterable[bytes], path: str) -> StreamStats:
+    """Pipe ``chunks`` into ``path`` without buffering them in memory."""
+    writer = StreamingFileWriter(path)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.commit()
@@ -0,0 +1,58 @@
+import json
+import os
+
+from asset_cache import AssetCache
+
+
+def _asset(tmp_path, name: str, size: int) -> str:
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_store_and_fetch(tmp_path):
+    cache = AssetCache(str(tmp_path / "cache"))
+    assert not cache.fetch("k", str(tmp_path / "out.mp3"))
+    cache.store("k", _asset(tmp_path, "voice.mp3", 10))
+    assert cache.fetch("k", str(tmp_path / "out.mp3"))
+    assert (tmp_path / "out.mp3").read_bytes() == b"x" * 10
+
+
+def test_instances_on_one_root_share_the_index(tmp_path):
+    # Like two worker processes using the same cache directory
+    first, second = AssetCache(str(tmp_path / "cache")), AssetCache(str(tmp_path / "cache"))
+    first.store("a", _asset(tmp_path, "a.mp3", 10))
+    second.store("b", _asset(tmp_path, "b.mp3", 20))
+    assert first.path_for("b") is not None
+    assert second.path_for("a") is not None
+    assert first.total_bytes() == second.total_bytes() == 30
+
+
+def test_eviction_counts_entries_stored_by_other_instances(tmp_path):
+    first = AssetCache(str(tmp_path / "cache"), max_bytes=25)
+    second = AssetCache(str(tmp_path / "cache"), max_bytes=25)
+    first.store("old", _asset(tmp_path, "old.mp3", 10))
+    second.store("new", _asset(tmp_path, "new.mp3", 20))
+    assert first.path_for("old") is None
+    assert first.path_for("new") is not None
+
+
+def test_missing_object_is_a_miss(tmp_path):
+    cache = AssetCache(str(tmp_path / "cache"))
+    os.remove(cache.store("k", _asset(tmp_path, "a.mp3", 5)))
+    assert cache.path_for("k") is None
+    assert cache.total_bytes() == 0
+
+
+def test_json_index_from_earlier_versions_is_imported(tmp_path):
+    root = tmp_path / "cache"
+    os.makedirs(root / "objects" / "ke")
+    (root / "objects" / "ke" / "key.mp3").write_bytes(b"abc")
+    (root / "index.json").write_text(json.dumps({
+        "key": {"file": os.path.join("objects", "ke", "key.mp3"), "size": 3, "last_used": 1.0},
+        "gone": {"file": os.path.join("objects", "go", "gone.mp3"), "size": 3, "last_used": 1.0},
+    }))
+    cache = AssetCache(str(root))
+    assert cache.path_for("key") is not None
+    assert cache.path_for("gone") is None
+    assert not (root / "index.json").exists()
@@ -0,0 +1,47 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("moviepy")
+
+import audio_mix
+
+
+def _voice(samples: int) -> "np.ndarray":
+    rng = np.random.default_rng(0)
+    voice = np.zeros((samples, audio_mix.CHANNELS), dtype=np.float32)
+    for start in range(0, samples, 30000):
+        # Bursts of speech with silence in between, so the music ducks and recovers
+        voice[start:start + 12000] = rng.uniform(-0.5, 0.5, voice[start:start + 12000].shape)
+    return voice
+
+
+@pytest.mark.parametrize("block", [1000, audio_mix.SAMPLE_RATE, 10**7])
+def test_mix_does_not_depend_on_block_size(block):
+    voice = _voice(5 * audio_mix.SAMPLE_RATE + 123)
+    music = np.random.default_rng(1).uniform(-1, 1, (audio_mix.SAMPLE_RATE, 2)).astype(np.float32)
+
+    reference = np.concatenate(list(audio_mix.mix_music([voice], music, 0.1)))
+    blocks = (voice[i:i + block] for i in range(0, len(voice), block))
+    mixed = np.concatenate(list(audio_mix.mix_music(blocks, music, 0.1)))
+
+    assert mixed.shape == voice.shape
+    np.testing.assert_allclose(mixed, reference, atol=1e-6)
+
+
+def test_lay_out_decodes_clips_as_the_track_reaches_them(monkeypatch):
+    decoded = []
+    clips = {"a.mp3": np.ones((100, 2), dtype=np.float32), "b.mp3": np.full((100, 2), 0.5, dtype=np.float32)}
+
+    def decode(path, **kwargs):
+        decoded.append(path)
+        return clips[path]
+
+    monkeypatch.setattr(audio_mix, "decode_audio", decode)
+    track = audio_mix.lay_out([(0.0, "a.mp3"), (300 / 44100, "b.mp3")], 500 / 44100, 200, sample_rate=44100)
+
+    first = next(track)
+    assert decoded == ["a.mp3"]
+    assert first[:100].min() == 1.0 and first[100:].max() == 0.0
+    rest = np.concatenate(list(track))
+    assert decoded == ["a.mp3", "b.mp3"]
+    assert rest[100:200].min() == 0.5 and len(rest) == 300
@@ -0,0 +1,81 @@
+import wave
+
+import pytest
+
+from audio_probe import mp3_duration, probe_duration
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, stereo, no padding
+HEADER = bytes([0xFF, 0xFB, 0x90, 0x00])
+FRAME_LENGTH = 144 * 128000 // 44100
+SAMPLES_PER_FRAME = 1152
+FRAME = HEADER + bytes(FRAME_LENGTH - 4)
+
+
+def _write(tmp_path, data: bytes, name: str = "voice.mp3") -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def _seconds(frames: int) -> float:
+    return frames * SAMPLES_PER_FRAME / 44100
+
+
+def test_cbr_frames_are_counted(tmp_path):
+    assert mp3_duration(_write(tmp_path, FRAME * 10)) == pytest.approx(_seconds(10))
+
+
+def test_truncated_last_frame_is_not_counted(tmp_path):
+    path = _write(tmp_path, FRAME * 10 + FRAME[:FRAME_LENGTH // 2])
+    assert mp3_duration(path) == pytest.approx(_seconds(10))
+
+
+def test_truncated_header_is_not_counted(tmp_path):
+    assert mp3_duration(_write(tmp_path, FRAME * 3 + HEADER[:2])) == pytest.approx(_seconds(3))
+
+
+def test_id3v2_tag_and_trailing_id3v1_tag_are_skipped(tmp_path):
+    # Syncsafe size 0x7F bytes, filled with 0xFF so a naive scan would false-sync
+    id3v2 = b"ID3\x03\x00\x00\x00\x00\x00\x7f" + b"\xff" * 0x7F
+    id3v1 = b"TAG" + bytes(125)
+    assert mp3_duration(_write(tmp_path, id3v2 + FRAME * 4 + id3v1)) == pytest.approx(_seconds(4))
+
+
+def test_xing_frame_count_is_used(tmp_path):
+    # Side info of a stereo MPEG-1 frame is 32 bytes; Xing follows it
+    xing = bytearray(FRAME)
+    xing[36:48] = b"Xing" + (1).to_bytes(4, "big") + (1000).to_bytes(4, "big")
+    assert mp3_duration(_write(tmp_path, bytes(xing) + FRAME * 2)) == pytest.approx(_seconds(1000))
+
+
+@pytest.mark.parametrize("tag, side_info", [(b"Xing", 17), (b"VBRI", 32)])
+def test_header_tag_cut_off_falls_back_to_counting_frames(tmp_path, tag, side_info):
+    # Mono (channel mode 3), so Xing sits after 17 bytes of side info; VBRI always after 32
+    mono = HEADER[:3] + bytes([0xC0])
+    assert mp3_duration(_write(tmp_path, mono + bytes(side_info) + tag)) == 0.0
+
+
+def test_file_without_frames_raises(tmp_path):
+    with pytest.raises(ValueError):
+        mp3_duration(_write(tmp_path, b"not audio at all" * 100))
+
+
+def test_file_cut_inside_first_header_raises(tmp_path):
+    with pytest.raises(ValueError):
+        mp3_duration(_write(tmp_path, HEADER[:3]))
+
+
+def test_wav_duration_from_header(tmp_path):
+    path = str(tmp_path / "voice.wav")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(8000)
+        f.writeframes(bytes(2 * 4000))
+    assert probe_duration(path) == pytest.approx(0.5)
+
+
+def test_probe_duration_is_cached_by_content(tmp_path):
+    first = _write(tmp_path, FRAME * 5, "a.mp3")
+    copy = _write(tmp_path, FRAME * 5, "b.mp3")
+    assert probe_duration(first) == probe_duration(copy) == pytest.approx(_seconds(5))
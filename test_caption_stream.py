@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from script_schema import CaptionStreamParser
+
+CAPTIONS = ["One small step", "Two quiet hills", "Three bright stars", "Four old roads", "Five last words"]
+SCRIPT = json.dumps({"topic": "Counting", "takeaway": "Numbers are everywhere", "captions": CAPTIONS})
+
+
+def _feed_in_chunks(text: str, size: int) -> list[tuple[int, str]]:
+    parser = CaptionStreamParser()
+    found = []
+    for i in range(0, len(text), size):
+        found.extend(parser.feed(text[i:i + size]))
+    return found
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_stream_parser_yields_each_caption_once(size):
+    assert _feed_in_chunks(SCRIPT, size) == list(enumerate(CAPTIONS, 1))
+
+
+def test_stream_parser_waits_for_the_closing_quote():
+    parser = CaptionStreamParser()
+    assert parser.feed('{"captions": ["Half a capt') == []
+    assert parser.feed('ion", "Next') == [(1, "Half a caption")]
+
+
+def test_stream_parser_handles_escapes():
+    text = json.dumps({"captions": ['She said "hi"', "back\\slash"]})
+    assert _feed_in_chunks(text, 2) == [(1, 'She said "hi"'), (2, "back\\slash")]
+
+
+def test_stream_parser_stops_at_non_string_entries():
+    parser = CaptionStreamParser()
+    assert parser.feed('{"captions": ["ok", 3, "ignored"]}') == [(1, "ok")]
+    assert parser.feed(' "more"') == []
+
+
+def test_stream_parser_ignores_text_before_captions():
+    assert _feed_in_chunks('{"topic": "t", "takeaway": "k", "captions": ["x"]}', 4) == [(1, "x")]
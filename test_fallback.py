@@ -0,0 +1,82 @@
+import threading
+import time
+
+from concurrency import TokenBucket
+from providers.fallback import Backend, call_with_fallback
+from providers.registry import Provider
+
+
+def _backend(provider: Provider, seconds_per_call: list[float], calls: list[str], limiter=None) -> Backend:
+    """A remote backend whose n-th request takes ``seconds_per_call[n]`` once it has a slot."""
+
+    def call(path):
+        if limiter is not None:
+            limiter.acquire_sync()
+        with provider.slot():
+            delay = seconds_per_call[len(calls)]
+            calls.append(path)
+            time.sleep(delay)
+            with open(path, "w") as f:
+                f.write(path)
+        return path
+
+    return Backend("remote", call, provider=provider, hedge_after=0.05)
+
+
+def _hold_slot(provider: Provider, seconds: float) -> threading.Thread:
+    held = threading.Event()
+
+    def hold():
+        with provider.slot():
+            held.set()
+            time.sleep(seconds)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    held.wait()
+    return thread
+
+
+def test_slow_request_is_hedged_and_only_the_winner_counts(tmp_path):
+    provider = Provider("remote", object, max_concurrency=2)
+    calls = []
+    result = call_with_fallback([_backend(provider, [0.5, 0.0], calls)], str(tmp_path / "out.mp3"))
+
+    assert result.hedged
+    assert (tmp_path / "out.mp3").read_text() == calls[1]
+    time.sleep(0.6)  # let the loser finish
+    assert provider.health.successes == 1
+    assert len(provider.health.latencies) == 1
+
+
+def test_saturated_provider_does_not_hedge(tmp_path):
+    provider = Provider("remote", object, max_concurrency=2)
+    other = _hold_slot(provider, 0.4)  # another job's request takes the second slot
+    calls = []
+    result = call_with_fallback([_backend(provider, [0.2, 0.0], calls)], str(tmp_path / "out.mp3"))
+    other.join()
+
+    assert not result.hedged
+    assert len(calls) == 1
+
+
+def test_duplicate_is_not_sent_without_a_rate_token(tmp_path):
+    provider = Provider("remote", object, max_concurrency=2)
+    limiter = TokenBucket(rate=1.0, capacity=1.0)
+    calls = []
+    result = call_with_fallback([_backend(provider, [0.2, 0.0], calls, limiter)], str(tmp_path / "out.mp3"))
+
+    assert not result.hedged
+    assert len(calls) == 1
+
+
+def test_waiting_for_a_slot_does_not_start_the_deadline(tmp_path):
+    provider = Provider("remote", object, max_concurrency=1)
+    other = _hold_slot(provider, 0.2)  # the request queues well past hedge_after
+    calls = []
+    result = call_with_fallback([_backend(provider, [0.01, 0.0], calls)], str(tmp_path / "out.mp3"))
+    other.join()
+
+    assert not result.hedged
+    assert len(calls) == 1
+    assert not list(tmp_path.glob("*.attempt*"))
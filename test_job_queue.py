@@ -0,0 +1,101 @@
+import time
+from contextlib import closing
+
+import pytest
+
+from job_queue import JobQueue, LeaseLostError
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "queue.db"), max_attempts=2, lease_seconds=60)
+
+
+def _expire_leases(queue):
+    with closing(queue._connect()) as db:
+        db.execute("UPDATE tasks SET lease_until = ? WHERE status = 'running'", (time.time() - 1,))
+
+
+def test_stages_wait_for_their_inputs(queue):
+    job_id = queue.submit("volcanoes")
+    assert queue.claim("tts", "w1") is None
+    script = queue.claim("script", "w1")
+    assert script.job_id == job_id and script.attempts == 1
+    queue.complete(script, {"captions": ["a", "b"]})
+
+    tts = queue.claim("tts", "w2")
+    assert tts.inputs == {"captions": ["a", "b"]}
+    queue.complete(tts, {"voiceovers": []})
+    assert queue.claim("render", "w3") is None  # image is not done yet
+
+    queue.complete(queue.claim("image", "w4"), {"images": []})
+    render = queue.claim("render", "w3")
+    assert render.inputs == {"captions": ["a", "b"], "voiceovers": [], "images": []}
+    queue.complete(render, {"video_path": "out.mp4"})
+    assert queue.status(job_id)["status"] == "done"
+
+
+def test_running_task_is_not_claimed_twice(queue):
+    queue.submit("volcanoes")
+    assert queue.claim("script", "w1") is not None
+    assert queue.claim("script", "w2") is None
+
+
+def test_expired_lease_is_reclaimed(queue):
+    queue.submit("volcanoes")
+    first = queue.claim("script", "w1")
+    _expire_leases(queue)
+
+    second = queue.claim("script", "w2")
+    assert second.job_id == first.job_id
+    assert second.attempts == 2
+    assert second.worker == "w2"
+
+
+def test_worker_that_lost_its_lease_cannot_complete_or_fail(queue):
+    job_id = queue.submit("volcanoes")
+    stale = queue.claim("script", "w1")
+    _expire_leases(queue)
+    current = queue.claim("script", "w2")
+
+    with pytest.raises(LeaseLostError):
+        queue.complete(stale, {"captions": ["stale"]})
+    with pytest.raises(LeaseLostError):
+        queue.fail(stale, "boom")
+    assert not queue.renew(stale)
+
+    queue.complete(current, {"captions": ["fresh"]})
+    assert queue.status(job_id)["stages"]["script"]["output"] == {"captions": ["fresh"]}
+
+
+def test_expired_lease_past_its_attempts_fails_the_job(queue):
+    job_id = queue.submit("volcanoes")
+    queue.claim("script", "w1")
+    _expire_leases(queue)
+    queue.claim("script", "w2")  # second and last attempt
+    _expire_leases(queue)
+
+    assert queue.claim("script", "w3") is None
+    status = queue.status(job_id)
+    assert status["status"] == "failed"
+    assert status["stages"]["script"]["status"] == "failed"
+    assert "lease expired" in status["error"]
+
+
+def test_failures_retry_until_attempts_run_out_then_resume_on_retry(queue):
+    job_id = queue.submit("volcanoes")
+    queue.fail(queue.claim("script", "w1"), "flaky")
+    assert queue.status(job_id)["status"] == "running"
+    queue.fail(queue.claim("script", "w1"), "flaky again")
+    assert queue.status(job_id)["status"] == "failed"
+    assert queue.claim("script", "w1") is None
+
+    assert queue.retry(job_id) == 1
+    task = queue.claim("script", "w1")
+    assert task.attempts == 1
+
+
+def test_renew_extends_a_held_lease(queue):
+    queue.submit("volcanoes")
+    task = queue.claim("script", "w1")
+    assert queue.renew(task)
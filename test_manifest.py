@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from asset_cache import file_digest
+from manifest import (
+    MANIFEST_NAME, AudioAsset, ImageAsset, JobManifest, ManifestError, load_manifest, record_assets
+)
+
+CAPTIONS = ["first", "second"]
+# One MPEG-1 Layer III frame (128 kbit/s, 44.1 kHz)
+MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0x00]) + bytes(413)
+
+
+def _assets(tmp_path, captions=CAPTIONS):
+    voices, images = [], []
+    for i, _ in enumerate(captions, 1):
+        voice = tmp_path / f"voiceover_{i}.mp3"
+        voice.write_bytes(MP3_FRAME * 10 * i)
+        voices.append(AudioAsset.from_file(str(voice)))
+        image = tmp_path / f"image_{i}.webp"
+        image.write_bytes(b"image" * i)
+        images.append(ImageAsset(str(image), file_digest(str(image)), image.stat().st_size, 1080, 1920))
+    return voices, images
+
+
+def test_voiceover_is_measured_once_when_recorded(tmp_path):
+    voices, _ = _assets(tmp_path)
+    assert voices[0].duration == pytest.approx(10 * 1152 / 44100)
+    assert voices[1].bytes == len(MP3_FRAME) * 20
+    assert len(voices[0].sha256) == 64
+
+
+def test_stages_fill_in_their_halves(tmp_path):
+    voices, images = _assets(tmp_path)
+    record_assets(str(tmp_path), CAPTIONS, voiceovers=voices)
+    record_assets(str(tmp_path), CAPTIONS, images=images)
+    manifest = load_manifest(str(tmp_path), CAPTIONS)
+    assert manifest.scenes() == list(zip(images, voices, CAPTIONS))
+
+
+def test_scene_order_follows_captions_not_file_names(tmp_path):
+    captions = [f"caption {i}" for i in range(1, 12)]
+    voices, images = _assets(tmp_path, captions)
+    manifest = JobManifest(captions, voices, images)
+    assert [image.path for image, _, _ in manifest.scenes()][9].endswith("image_10.webp")
+
+
+def test_missing_manifest(tmp_path):
+    with pytest.raises(ManifestError, match="no manifest.json"):
+        load_manifest(str(tmp_path))
+
+
+def test_manifest_for_other_captions_is_rejected(tmp_path):
+    voices, images = _assets(tmp_path)
+    record_assets(str(tmp_path), CAPTIONS, voiceovers=voices, images=images)
+    with pytest.raises(ManifestError, match="different captions"):
+        load_manifest(str(tmp_path), ["first", "edited"])
+
+
+def test_recording_for_other_captions_starts_over(tmp_path):
+    voices, images = _assets(tmp_path)
+    record_assets(str(tmp_path), CAPTIONS, voiceovers=voices)
+    record_assets(str(tmp_path), ["new", "script"], images=images)
+    manifest = load_manifest(str(tmp_path), ["new", "script"])
+    assert manifest.voiceovers == [None, None]
+    with pytest.raises(ManifestError, match="scene 1 has no voiceover"):
+        manifest.scenes()
+
+
+def test_changed_file_is_detected(tmp_path):
+    voices, images = _assets(tmp_path)
+    manifest = JobManifest(CAPTIONS, voices, images)
+    (tmp_path / "image_2.webp").write_bytes(b"a different image")
+    with pytest.raises(ManifestError, match="scene 2 image changed"):
+        manifest.scenes()
+
+
+def test_same_size_edit_is_detected(tmp_path):
+    voices, images = _assets(tmp_path)
+    manifest = JobManifest(CAPTIONS, voices, images)
+    (tmp_path / "image_1.webp").write_bytes(b"IMAGE")
+    with pytest.raises(ManifestError, match="scene 1 image changed"):
+        manifest.scenes()
+
+
+def test_given_manifest_is_checked_against_the_captions(tmp_path):
+    voices, images = _assets(tmp_path)
+    manifest = JobManifest(CAPTIONS, voices, images)
+    manifest.check(list(CAPTIONS))
+    with pytest.raises(ManifestError, match="different captions"):
+        manifest.check(["first", "edited"])
+
+
+def test_round_trip_and_unreadable_files(tmp_path):
+    voices, images = _assets(tmp_path)
+    manifest = JobManifest(CAPTIONS, voices, images)
+    assert JobManifest.from_dict(json.loads(json.dumps(manifest.to_dict()))) == manifest
+
+    (tmp_path / MANIFEST_NAME).write_text("{not json")
+    with pytest.raises(ManifestError, match="unreadable"):
+        load_manifest(str(tmp_path))
+    (tmp_path / MANIFEST_NAME).write_text(json.dumps({**manifest.to_dict(), "version": 99}))
+    with pytest.raises(ManifestError, match="unsupported manifest version"):
+        load_manifest(str(tmp_path))
@@ -1,4 +1,5 @@
 import asyncio
+from manifest import JobManifest
 from tools import generate_voiceovers, generate_images, generate_video
 
 stub_captions = [
@@ -9,14 +10,17 @@ stub_captions = [
     "Island bliss. Your next escape."
 ]
 
-# Generate voiceovers (will use existing files if present)
-voiceover_paths = asyncio.run(generate_voiceovers(stub_captions))
-print("Voiceovers:", voiceover_paths)
+# The render pool spawns workers that re-import __main__; without the guard
+# each of them would repeat the paid TTS and image requests
+if __name__ == "__main__":
+    # Generate voiceovers (will use existing files if present)
+    voiceovers = asyncio.run(generate_voiceovers(stub_captions))
+    print("Voiceovers:", [voiceover.path for voiceover in voiceovers])
 
-# Generate images (will use local images)
-image_paths = generate_images(stub_captions)
-print("Images:", image_paths)
+    # Generate images (will use local images)
+    images = generate_images(stub_captions)
+    print("Images:", [image.path for image in images])
 
-# Generate video
-generate_video(stub_captions)
-print("Video generated as final_output.mp4")
\ No newline at end of file
+    # Generate video
+    generate_video(stub_captions, manifest=JobManifest(stub_captions, voiceovers, images))
+    print("Video generated as final_output.mp4")
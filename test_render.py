@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+pytest.importorskip("moviepy")
+
+import render
+from asset_cache import AssetCache
+from manifest import AudioAsset, ImageAsset
+from timeline import plan_timeline
+
+
+def _write_in_place(img_path, voice_path, caption, output_path, plan, encoder):
+    # Like ffmpeg -y: truncate and write whatever file is at output_path
+    with open(output_path, "wb") as f:
+        f.write(caption.encode("utf-8"))
+
+
+def test_rerender_does_not_overwrite_cached_segment(tmp_path, monkeypatch):
+    cache = AssetCache(str(tmp_path / "segments"))
+    monkeypatch.setattr(render, "segment_cache", cache)
+    monkeypatch.setattr(render, "_encode_still_scene", _write_in_place)
+
+    image = ImageAsset(str(tmp_path / "image_1.webp"), "img", 1, 1080, 1920)
+    voice = AudioAsset(str(tmp_path / "voiceover_1.mp3"), "voice", 1, 1.0)
+    plan = plan_timeline([voice.duration])[0]
+    output_path = str(tmp_path / "scene_1.mp4")
+
+    render.render_scene(image, voice, "caption A", output_path, motion="still", plan=plan)
+    key_a = render.scene_cache_key(image, voice, "caption A", plan, motion="still")
+
+    # The caption was edited: a miss that encodes onto the same path
+    render.render_scene(image, voice, "caption B", output_path, motion="still", plan=plan)
+
+    with open(cache.path_for(key_a), "rb") as f:
+        assert f.read() == b"caption A"
+    with open(output_path, "rb") as f:
+        assert f.read() == b"caption B"
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from script_schema import ScriptValidationError, parse_script, repair_prompt
+
+CAPTIONS = ["One small step", "Two quiet hills", "Three bright stars", "Four old roads", "Five last words"]
+SCRIPT = json.dumps({"topic": "Counting", "takeaway": "Numbers are everywhere", "captions": CAPTIONS})
+
+
+def test_plain_json():
+    assert parse_script(SCRIPT).captions == CAPTIONS
+
+
+def test_code_fence_and_prose_around_it():
+    script = parse_script(f"Sure! Here it is:\n```json\n{SCRIPT}\n```\nEnjoy.")
+    assert script.topic == "Counting"
+
+
+def test_prose_after_json_with_braces():
+    # Slicing up to the last "}" would swallow the trailing prose
+    assert parse_script(SCRIPT + "\nNote: use {braces} sparingly }").captions == CAPTIONS
+
+
+def test_prose_before_json_with_braces():
+    assert parse_script("Format: {topic, takeaway, captions}\n" + SCRIPT).captions == CAPTIONS
+
+
+def test_invalid_json():
+    with pytest.raises(ScriptValidationError, match="not valid JSON"):
+        parse_script('{"topic": "Counting", ')
+
+
+def test_not_an_object():
+    with pytest.raises(ScriptValidationError):
+        parse_script(json.dumps(CAPTIONS))
+
+
+def test_all_problems_are_listed():
+    reply = json.dumps({"topic": "", "captions": ["a"] * 3 + ["one two three four five six seven eight nine"]})
+    with pytest.raises(ScriptValidationError) as error:
+        parse_script(reply)
+    assert len(error.value.errors) == 4  # topic, takeaway, caption count, caption 4 length
+    assert "caption 4 has 9 words" in repair_prompt(error.value)
+
+
+def test_captions_are_stripped():
+    reply = json.dumps({"topic": "t", "takeaway": "k", "captions": [f"  {c} " for c in CAPTIONS]})
+    assert parse_script(reply).captions == CAPTIONS
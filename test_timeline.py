@@ -0,0 +1,56 @@
+import pytest
+
+from timeline import ScenePlan, plan_timeline, total_duration
+
+FPS = 24
+
+
+def _plan(speech, **kwargs):
+    options = dict(fps=FPS, min_duration=2.0, lead_in=0.15, tail=0.35, crossfade=0.0)
+    options.update(kwargs)
+    return plan_timeline(speech, **options)
+
+
+def test_short_line_gets_min_duration():
+    assert _plan([0.5])[0].duration == pytest.approx(2.0)
+
+
+def test_long_line_is_never_cut():
+    plan = _plan([7.3])[0]
+    assert plan.duration >= plan.lead_in + plan.speech + 0.35
+    assert plan.speech_start == pytest.approx(0.15)
+
+
+def test_durations_are_whole_frames():
+    for plan in _plan([1.01, 2.337, 3.9999, 5.0]):
+        assert plan.duration * FPS == pytest.approx(round(plan.duration * FPS))
+
+
+def test_scenes_are_back_to_back():
+    plans = _plan([1.0, 3.0, 2.5])
+    assert [plan.index for plan in plans] == [1, 2, 3]
+    for previous, following in zip(plans, plans[1:]):
+        assert following.start == pytest.approx(previous.end)
+    assert total_duration(plans) == pytest.approx(plans[-1].end)
+
+
+def test_crossfade_overlaps_scenes_without_overlapping_voices():
+    plans = _plan([3.0, 3.0], crossfade=0.5)
+    assert plans[1].start == pytest.approx(plans[0].end - 0.5)
+    # The first voice has ended before the second scene fades in
+    assert plans[0].speech_start + plans[0].speech <= plans[1].start
+
+
+def test_crossfade_is_capped_at_half_the_min_duration():
+    plans = _plan([0.1, 0.1], crossfade=5.0)
+    assert plans[0].end - plans[1].start == pytest.approx(1.0)
+
+
+def test_empty_timeline():
+    assert _plan([]) == []
+    assert total_duration([]) == 0.0
+
+
+def test_plan_is_immutable():
+    with pytest.raises(AttributeError):
+        ScenePlan(1, 0.0, 2.0, 0.15, 1.0).duration = 3.0
@@ -2,19 +2,14 @@ import os
 import asyncio
 from autogen_core.tools import FunctionTool
 from typing_extensions import Annotated
-from elevenlabs import ElevenLabs
 from autogen_core import CancellationToken
 from dotenv import load_dotenv
+from providers import elevenlabs_tts
 
 load_dotenv()
 
-import os
-print("API Key loaded:", os.getenv("ELEVENLABS_API_KEY"))
-
 # Setup
-elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
 voice_id = "2qfp6zPuviqeCOZIE9RZ"
-elevenlabs_client = ElevenLabs(api_key=elevenlabs_api_key)
 
 async def generate_voiceovers(messages: list[str]) -> list[str]:
     print("Agent reached here----")
@@ -53,26 +48,12 @@ async def generate_voiceovers(messages: list[str]) -> list[str]:
 
             print(f"Generating voiceover {i}/{len(messages)}...")
             
-            # Generate audio with ElevenLabs
-            response = elevenlabs_client.text_to_speech.convert(
-                text=message,
-                voice_id=voice_id,
-                model_id="eleven_multilingual_v2",
-                output_format="mp3_22050_32",
+            # Generate audio with ElevenLabs, streaming chunks straight to disk
+            stats = elevenlabs_tts.synthesize_to_file(
+                message, voice_id, "eleven_multilingual_v2", "mp3_22050_32", save_file_path
             )
-            
-            # Collect audio chunks
-            audio_chunks = []
-            for chunk in response:
-                if chunk:
-                    audio_chunks.append(chunk)
-            
-            # Save to file
-            with open(save_file_path, "wb") as f:
-                for chunk in audio_chunks:
-                    f.write(chunk)
-                        
-            print(f"Voiceover {i} generated successfully")
+
+            print(f"Voiceover {i} generated successfully ({stats.bytes_written} bytes)")
             audio_file_paths.append(save_file_path)
         
         except Exception as e:
@@ -0,0 +1,58 @@
+import math
+import os
+from dataclasses import dataclass
+
+MIN_SCENE_DURATION = float(os.getenv("MIN_SCENE_DURATION", "2.0"))  # seconds on screen, even for short lines
+SCENE_LEAD_IN = float(os.getenv("SCENE_LEAD_IN", "0.15"))  # silence before the voice starts
+SCENE_TAIL = float(os.getenv("SCENE_TAIL", "0.35"))  # silence after the voice ends
+SCENE_CROSSFADE = float(os.getenv("SCENE_CROSSFADE", "0.0"))  # dissolve between scenes
+
+
+@dataclass(frozen=True)
+class ScenePlan:
+    """Where one scene sits on the video timeline; all times in seconds."""
+    index: int
+    start: float
+    duration: float
+    lead_in: float  # offset of the voice from the start of the scene
+    speech: float  # length of the voiceover, never cut
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+    @property
+    def speech_start(self) -> float:
+        return self.start + self.lead_in
+
+
+def plan_timeline(speech_durations: list[float], fps: int = 24,
+                  min_duration: float = MIN_SCENE_DURATION,
+                  lead_in: float = SCENE_LEAD_IN,
+                  tail: float = SCENE_TAIL,
+                  crossfade: float = SCENE_CROSSFADE) -> list[ScenePlan]:
+    """
+    Lay scenes out back to back from the length of their voiceovers.
+
+    Every scene lasts at least ``lead_in + speech + tail`` (and at least
+    ``min_duration``), rounded up to whole frames, so no voiceover is cut.
+    With a crossfade, each scene starts ``crossfade`` seconds before the
+    previous one ends; the tail is stretched to cover the overlap so two
+    voices never play at once.
+
+    Returns:
+        One plan per scene, in order
+    """
+    crossfade = round(max(0.0, min(crossfade, min_duration / 2)) * fps) / fps
+    plans = []
+    start = 0.0
+    for index, speech in enumerate(speech_durations, 1):
+        duration = max(min_duration, lead_in + speech + max(tail, crossfade))
+        duration = math.ceil(round(duration * fps, 6)) / fps
+        plans.append(ScenePlan(index=index, start=start, duration=duration, lead_in=lead_in, speech=speech))
+        start += duration - crossfade
+    return plans
+
+
+def total_duration(plans: list[ScenePlan]) -> float:
+    return plans[-1].end if plans else 0.0
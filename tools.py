@@ -1,205 +1,256 @@
 # tools.py
+# Heavy backends (elevenlabs, requests, moviepy) are imported lazily by the
+# provider modules and the renderer, so importing this module is cheap.
 import asyncio
-from autogen_core.tools import FunctionTool
-from typing_extensions import Annotated
-from elevenlabs import ElevenLabs
-from autogen_core import CancellationToken
-from moviepy.editor import (
-    ImageClip, TextClip, AudioFileClip,
-    CompositeVideoClip, concatenate_videoclips
-)
-from moviepy.audio.AudioClip import CompositeAudioClip
-from moviepy.video.fx.resize import resize
+import contextvars
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from asset_cache import asset_cache, audio_cache_key, image_cache_key
+from concurrency import TokenBucket
+from manifest import AudioAsset, ImageAsset, JobManifest, load_manifest
+from providers import elevenlabs_tts, local_tts, placeholder_image, stability
+from providers.fallback import Backend, call_with_fallback
+from streaming import StreamStats
+from tracing import span
 load_dotenv()
 
 
-print("API Key loaded:", os.getenv("ELEVENLABS_API_KEY"))
-
 # Setup
-elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
 voice_id = "2qfp6zPuviqeCOZIE9RZ"
-elevenlabs_client = ElevenLabs(api_key=elevenlabs_api_key)
-
-
-print("API Key loaded", os.getenv("STABILITY_API_KEY"))
-
-stability_api_key = os.getenv("STABILITY_API_KEY")
 
 
 #VIOCECOVER FUNCTION
-async def generate_voiceovers(messages: list[str]) -> list[str]:
-    print("Agent reached here----")
+TTS_MODEL_ID = "eleven_multilingual_v2"
+TTS_OUTPUT_FORMAT = "mp3_22050_32"
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "4"))
+TTS_REQUESTS_PER_SECOND = float(os.getenv("TTS_REQUESTS_PER_SECOND", "2"))
+TTS_MAX_ATTEMPTS = 3
+# Send a duplicate request if ElevenLabs has not answered by its p95 latency
+# (or this many seconds, until enough calls have been timed)
+TTS_HEDGE_AFTER = float(os.getenv("TTS_HEDGE_AFTER", "4"))
+# "local": speak with espeak-ng when ElevenLabs fails or its circuit is open
+TTS_FALLBACK = os.getenv("TTS_FALLBACK", "local")
+
+tts_rate_limiter = TokenBucket(TTS_REQUESTS_PER_SECOND, capacity=TTS_MAX_CONCURRENCY)
+
+
+def _synthesize_voiceover(message: str, save_file_path: str) -> StreamStats:
+    """Blocking ElevenLabs call; runs in a worker thread."""
+    tts_rate_limiter.acquire_sync()
+    # Chunks go straight to disk as they arrive
+    return elevenlabs_tts.synthesize_to_file(message, voice_id, TTS_MODEL_ID, TTS_OUTPUT_FORMAT, save_file_path)
+
+
+def tts_backends(message: str) -> list[Backend]:
+    backends = [Backend(
+        "elevenlabs", lambda path: _synthesize_voiceover(message, path),
+        provider=elevenlabs_tts.provider, hedge_after=TTS_HEDGE_AFTER, attempts=TTS_MAX_ATTEMPTS,
+    )]
+    if TTS_FALLBACK == "local" and local_tts.available():
+        backends.append(Backend("local_tts", lambda path: local_tts.synthesize_to_file(message, path), cacheable=False))
+    return backends
+
+
+async def generate_voiceover(i: int, total: int, message: str, semaphore: asyncio.Semaphore,
+                             output_dir: str = "voiceovers") -> AudioAsset:
     """
-    Generate voiceovers for a list of messages using ElevenLabs API.
-    
-    Args:
-        messages: List of messages to convert to speech
-        
-    Returns:
-        List of file paths to the generated audio files
+    Generate (or fetch from cache) the voiceover for scene ``i``, hashed
+    and measured for the job manifest.
+
+    Raises:
+        RuntimeError: if ElevenLabs and the fallback both failed
     """
-    os.makedirs("voiceovers", exist_ok=True)
-    
-    # Check for existing files first
-    audio_file_paths = []
-    for i in range(1, len(messages) + 1):
-        file_path = f"voiceovers/voiceover_{i}.mp3"
-        if os.path.exists(file_path):
-            audio_file_paths.append(file_path)
-            
-    # If all files exist, return them
-    if len(audio_file_paths) == len(messages):
-        print("All voiceover files already exist. Skipping generation.")
-        return audio_file_paths
-        
-    # Generate missing files one by one
-    audio_file_paths = []
-    for i, message in enumerate(messages, 1):
+    save_file_path = os.path.join(output_dir, f"voiceover_{i}.mp3")
+    cache_key = audio_cache_key(message, voice_id, TTS_MODEL_ID, TTS_OUTPUT_FORMAT)
+    with span("tts", category="tts", scene=i) as attrs:
+        if asset_cache.fetch(cache_key, save_file_path):
+            attrs["cache"] = "hit"
+            print(f"Voiceover {i} served from cache.")
+            return await asyncio.to_thread(AudioAsset.from_file, save_file_path, "cache")
+        attrs["cache"] = "miss"
+
         try:
-            save_file_path = f"voiceovers/voiceover_{i}.mp3"
-            if os.path.exists(save_file_path):
-                print(f"File {save_file_path} already exists, skipping generation.")
-                audio_file_paths.append(save_file_path)
-                continue
-
-            print(f"Generating voiceover {i}/{len(messages)}...")
-            
-            # Generate audio with ElevenLabs
-            response = elevenlabs_client.text_to_speech.convert(
-                text=message,
-                voice_id=voice_id,
-                model_id="eleven_multilingual_v2",
-                output_format="mp3_22050_32",
-            )
-            
-            # Collect audio chunks
-            audio_chunks = []
-            for chunk in response:
-                if chunk:
-                    audio_chunks.append(chunk)
-            
-            # Save to file
-            with open(save_file_path, "wb") as f:
-                for chunk in audio_chunks:
-                    f.write(chunk)
-                        
-            print(f"Voiceover {i} generated successfully")
-            audio_file_paths.append(save_file_path)
-        
+            print(f"Generating voiceover {i}/{total}...")
+            async with semaphore:
+                outcome = await asyncio.to_thread(call_with_fallback, tts_backends(message), save_file_path)
         except Exception as e:
+            attrs["error"] = str(e)
             print(f"Error generating voiceover for message: {message}. Error: {e}")
-            continue
-            
-    return audio_file_paths
-
-
-
-# IMAGE GENERATION
-
-def generate_images(prompts: list[str]) -> list[str]:
+            raise
+        if outcome.backend.cacheable:
+            asset_cache.store(cache_key, save_file_path)
+        stats = outcome.result
+        attrs["backend"] = outcome.backend.name
+        attrs["hedged"] = outcome.hedged
+        attrs["bytes"] = stats.bytes_written
+        attrs["first_byte_s"] = stats.first_byte_latency
+        print(f"Voiceover {i} generated with {outcome.backend.name} "
+              f"({stats.bytes_written} bytes, first byte after {stats.first_byte_latency or 0:.2f}s)")
+        return await asyncio.to_thread(AudioAsset.from_file, save_file_path, outcome.backend.name)
+
+
+async def generate_voiceovers(messages: list[str], max_concurrency: int = TTS_MAX_CONCURRENCY,
+                              output_dir: str = "voiceovers") -> list[AudioAsset]:
     """
-    Generate images based on text prompts using Stability AI API.
+    Generate voiceovers for a list of messages using ElevenLabs API.
+
+    Audio is looked up in the content-addressed asset cache first. Cache
+    misses are synthesized concurrently in worker threads, bounded by
+    ``max_concurrency`` and the shared TTS rate limiter, with retries,
+    hedged requests and a fallback to the local TTS engine.
 
     Args:
-        prompts: List of text prompts to generate images from
+        messages: List of messages to convert to speech
+        max_concurrency: Maximum number of in-flight ElevenLabs requests
+        output_dir: Directory the voiceover files are written to
 
     Returns:
-        List of file paths to the generated images
+        The generated voiceovers (path, hash, duration), in message order
+
+    Raises:
+        RuntimeError: if any voiceover could not be generated
     """
-    seed = 42
-    output_dir = "images"
     os.makedirs(output_dir, exist_ok=True)
 
-    stability_api_key = os.getenv("STABILITY_API_KEY")
-    stability_api_url = "https://api.stability.ai/v2beta/stable-image/generate/core"
-    headers = {
-        "Authorization": f"Bearer {stability_api_key}",
-        "Accept": "image/*"
-    }
-
-    image_paths = []
-    for i, prompt in enumerate(prompts, 1):
-        print(f"Generating image {i}/{len(prompts)} for prompt: {prompt}")
-
-        # Skip if image already exists
-        image_path = os.path.join(output_dir, f"image_{i}.webp")
-        if not os.path.exists(image_path):
-            # Prepare request payload
-            payload = {
-                "prompt": (None, prompt),
-                "output_format": (None, "webp"),
-                "height": (None, "1920"),
-                "width": (None, "1080"),
-                "seed": (None, str(seed))
-            }
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results = await asyncio.gather(*[
+        generate_voiceover(i, len(messages), message, semaphore, output_dir)
+        for i, message in enumerate(messages, 1)
+    ], return_exceptions=True)
+    failed = [f"{i}: {result}" for i, result in enumerate(results, 1) if isinstance(result, BaseException)]
+    if failed:
+        raise RuntimeError("Voiceovers failed for scenes " + "; ".join(failed))
+    return results
 
-            try:
-                response = requests.post(stability_api_url, headers=headers, files=payload)
-                if response.status_code == 200:
-                    with open(image_path, "wb") as image_file:
-                        image_file.write(response.content)
-                    print(f"Image saved to {image_path}")
-                else:
-                    print(f"Error generating image {i}: {response.json()}")
-            except Exception as e:
-                print(f"Error generating image {i}: {e}")
-        else:
-            print(f"Image already exists: {image_path}")
 
-        image_paths.append(image_path)
-    return image_paths
 
+# IMAGE GENERATION
+IMAGE_SEED = 42
+IMAGE_WIDTH, IMAGE_HEIGHT = 1080, 1920
+IMAGE_FORMAT = "webp"
+IMAGE_MAX_CONCURRENCY = int(os.getenv("IMAGE_MAX_CONCURRENCY", "4"))
+IMAGE_HEDGE_AFTER = float(os.getenv("IMAGE_HEDGE_AFTER", "10"))
+# "placeholder": draw a gradient background when Stability fails or its circuit is open
+IMAGE_FALLBACK = os.getenv("IMAGE_FALLBACK", "placeholder")
+
+
+def image_backends(prompt: str) -> list[Backend]:
+    backends = [Backend(
+        "stability",
+        lambda path: stability.download_image(prompt, path, IMAGE_WIDTH, IMAGE_HEIGHT, IMAGE_SEED, IMAGE_FORMAT),
+        provider=stability.provider, hedge_after=IMAGE_HEDGE_AFTER,
+    )]
+    if IMAGE_FALLBACK == "placeholder":
+        backends.append(Backend(
+            "placeholder",
+            lambda path: placeholder_image.render_to_file(prompt, path, IMAGE_WIDTH, IMAGE_HEIGHT, IMAGE_FORMAT),
+            cacheable=False,
+        ))
+    return backends
+
+
+def generate_image(i: int, total: int, prompt: str, output_dir: str = "images") -> ImageAsset:
+    """
+    Generate (or fetch from cache) the image for scene ``i``, hashed and
+    measured for the job manifest; blocking.
 
-#VIDEO CREATION
+    Raises:
+        RuntimeError: if Stability and the fallback both failed
+    """
+    print(f"Generating image {i}/{total} for prompt: {prompt}")
+    image_path = os.path.join(output_dir, f"image_{i}.{IMAGE_FORMAT}")
+    cache_key = image_cache_key(prompt, IMAGE_SEED, IMAGE_WIDTH, IMAGE_HEIGHT, IMAGE_FORMAT)
+    with span("image", category="image", scene=i) as attrs:
+        if asset_cache.fetch(cache_key, image_path):
+            attrs["cache"] = "hit"
+            print(f"Image served from cache: {image_path}")
+            return ImageAsset.from_file(image_path, "cache")
+        attrs["cache"] = "miss"
 
-IMAGE_DURATION = 5  # seconds
-WIDTH, HEIGHT = 1080, 1920
-FONT = "./arialbd.ttf"  # Make sure this path is correct
-BACKGROUND_MUSIC = "music/grey-sky-810121-PREVIEW.mp3"
+        try:
+            outcome = call_with_fallback(image_backends(prompt), image_path)
+        except Exception as e:
+            attrs["error"] = str(e)
+            print(f"Error generating image {i}: {e}")
+            raise
+        if outcome.backend.cacheable:
+            asset_cache.store(cache_key, image_path)
+        attrs["backend"] = outcome.backend.name
+        attrs["hedged"] = outcome.hedged
+        attrs["bytes"] = outcome.result.bytes_written
+        attrs["first_byte_s"] = outcome.result.first_byte_latency
+        print(f"Image saved to {image_path} ({outcome.backend.name})")
+        return ImageAsset.from_file(image_path, outcome.backend.name)
 
-def generate_video(captions):
-    print("Video generation agent reached here")
-    images = sorted(f"images/{f}" for f in os.listdir("images") if f.lower().endswith((".png", ".jpg", ".jpeg", ".webp", ".jfif")))
-    voices = sorted(f"voiceovers/{f}" for f in os.listdir("voiceovers") if f.lower().endswith(".mp3"))
 
-    assert len(images) == len(voices) == len(captions), \
-        f"Counts mismatch: images={len(images)}, voices={len(voices)}, captions={len(captions)}"
+IMAGE_PROMPT_TEMPLATE = "{caption} in Abstract Art Style / Ultra High Quality."
 
-    clips = []
 
-    for img_path, voice_path, cap in zip(images, voices, captions):
-        print(f"🖼️ Processing: {img_path} | 🎙️ {voice_path} | 📝 '{cap}'")
+def caption_to_prompt(caption: str) -> str:
+    return IMAGE_PROMPT_TEMPLATE.format(caption=caption)
 
-        img = ImageClip(img_path).fx(resize, height=HEIGHT)
-        voice = AudioFileClip(voice_path)
-        img_duration = min(IMAGE_DURATION, voice.duration)
-        img = img.set_duration(img_duration).set_pos("center")
 
-        txt = TextClip(cap, font=FONT, fontsize=64, color="white", method="caption", size=(WIDTH-100, None))
-        txt = txt.set_duration(img_duration).set_pos(("center", HEIGHT - 200))
+def generate_images(prompts: list[str], max_concurrency: int = IMAGE_MAX_CONCURRENCY,
+                    output_dir: str = "images") -> list[ImageAsset]:
+    """
+    Generate images based on text prompts using Stability AI API.
 
-        voice = voice.set_duration(img_duration)
+    Images are looked up in the content-addressed asset cache first. Cache
+    misses are requested in parallel over a pooled keep-alive session and
+    streamed to disk; slow requests are hedged, and a placeholder is drawn
+    when Stability is down.
 
-        comp = CompositeVideoClip([img, txt], size=(WIDTH, HEIGHT))
-        comp = comp.set_audio(voice)
-        clips.append(comp)
+    Args:
+        prompts: List of text prompts to generate images from
+        max_concurrency: Maximum number of in-flight Stability requests
+        output_dir: Directory the images are written to
+
+    Returns:
+        The generated images (path, hash, dimensions), in prompt order
 
-    final = concatenate_videoclips(clips, method="compose")
+    Raises:
+        RuntimeError: if any image could not be generated
+    """
+    os.makedirs(output_dir, exist_ok=True)
 
-    # 🎵 Add background music
-    if os.path.exists(BACKGROUND_MUSIC):
-        bg_music = AudioFileClip(BACKGROUND_MUSIC).volumex(0.1)  # Lower volume
-        bg_music = bg_music.set_duration(final.duration)
-        mixed_audio = CompositeAudioClip([final.audio, bg_music])
-        final = final.set_audio(mixed_audio)
-    else:
-        print("⚠️ No background music found. Skipping...")
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        futures = [
+            # copy_context keeps the caller's tracer visible in the worker thread
+            executor.submit(contextvars.copy_context().run, generate_image, i, len(prompts), prompt, output_dir)
+            for i, prompt in enumerate(prompts, 1)
+        ]
+        images, failed = [], []
+        for i, future in enumerate(futures, 1):
+            try:
+                images.append(future.result())
+            except Exception as e:
+                failed.append(f"{i}: {e}")
+    if failed:
+        raise RuntimeError("Images failed for scenes " + "; ".join(failed))
+    return images
 
-    final.write_videofile("final_output.mp4", fps=24)
-    print("✅ Done: final_output.mp4")
 
+#VIDEO CREATION
 
+def generate_video(captions, workdir: str = ".", manifest: JobManifest | None = None) -> str:
+    """
+    Render the job's final video from its manifest (``workdir/manifest.json``
+    unless one is given).
 
+    Raises:
+        ManifestError: if the manifest is for other captions or misses assets
+    """
+    # moviepy is only loaded once a video is actually rendered
+    from render import SCENES_DIR, render_video
+
+    manifest = manifest or load_manifest(workdir)
+    manifest.check(captions)
+
+    # Each scene is rendered to its own cached segment, so editing one
+    # caption only re-encodes that scene
+    return render_video(
+        manifest,
+        os.path.join(workdir, "final_output.mp4"),
+        scenes_dir=os.path.join(workdir, SCENES_DIR),
+    )
@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class Tracer:
+    """
+    Collects timing spans for one job and exports them in Chrome trace format
+    (load the file in chrome://tracing or https://ui.perfetto.dev).
+
+    ``listener``, if given, is called with every finished span's event, on
+    whichever thread closed the span.
+    """
+
+    def __init__(self, name: str = "job", listener=None):
+        self.name = name
+        self.events = []
+        self.listener = listener
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, category: str = "pipeline", **attrs):
+        """
+        Time the enclosed block. Yields the span's attribute dict so callers
+        can attach results such as byte counts or cache hit/miss.
+        """
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            end = time.perf_counter()
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": start * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": attrs,
+            }
+            with self._lock:
+                self.events.append(event)
+            if self.listener is not None:
+                self.listener(event)
+
+    def summary(self) -> dict:
+        """Count, total and max duration in milliseconds per span name."""
+        stats = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            entry = stats.setdefault(event["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            duration_ms = event["dur"] / 1000
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+        return stats
+
+    def export(self, path: str) -> str:
+        with self._lock:
+            events = list(self.events)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"job": self.name}}, f)
+        return path
+
+
+_current_tracer: ContextVar[Tracer | None] = ContextVar("current_tracer", default=None)
+_span_tags: ContextVar[dict] = ContextVar("span_tags", default={})
+
+
+def current_tracer() -> Tracer | None:
+    return _current_tracer.get()
+
+
+@contextmanager
+def tracing(tracer: Tracer):
+    """Make ``tracer`` receive all spans opened in this context (including child tasks)."""
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
+
+
+@contextmanager
+def span_tags(**tags):
+    """Add ``tags`` to the attributes of every span opened in this context (including child tasks)."""
+    token = _span_tags.set({**_span_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _span_tags.reset(token)
+
+
+@contextmanager
+def span(name: str, category: str = "pipeline", **attrs):
+    """Open a span on the current tracer; a no-op when tracing is off."""
+    attrs = {**_span_tags.get(), **attrs}
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield attrs
+        return
+    with tracer.span(name, category, **attrs) as span_attrs:
+        yield span_attrs